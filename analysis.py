@@ -0,0 +1,795 @@
+"""Resume analysis pipeline without any Streamlit dependency.
+
+Shared by the Streamlit app (app.py) and the headless batch runner
+(batch_cli.py). Functions here raise or return errors instead of
+rendering them.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import analysis_result
+import company_store
+import llm_cache
+import metrics
+import neardup
+import pdf_extract
+import prompt_builder
+import resilience
+import routing
+import singleflight
+import skills
+
+GROQ_MODEL = "llama3-70b-8192"
+GROQ_TEMPERATURE = 0.3
+GROQ_MAX_TOKENS = 4000
+
+# Used when no route is chosen: the full analysis on the large model
+DEFAULT_ROUTE = routing.Route("Detailed", GROQ_MODEL, GROQ_MAX_TOKENS, analysis_result.SECTION_KEYS, None)
+
+# Sections filled from the local skill scan (see apply_keywords) instead of by the model
+KEYWORD_SECTIONS = routing.OPTIONAL_SECTIONS["keywords"]
+# Items per keyword section, matching their "Top 3" titles
+KEYWORD_ITEMS = 3
+
+# Map-reduce analysis of documents too long for one prompt (see map_reduce_prompt)
+DEFAULT_CHUNK_TOKENS = 1500
+DEFAULT_MAP_WORKERS = 4
+# Completion tokens per chunk: a few short notes
+MAP_MAX_TOKENS = 500
+MAP_NOTE_ITEMS = 5
+# Tokens of the other document sent with each chunk, packed by relevance to the chunk
+MAP_CONTEXT_TOKENS = 600
+# Tokens of the company "about" text in the reduce prompt
+REDUCE_ABOUT_TOKENS = 400
+
+# Edits larger than this share of the resume get a full analysis instead of an incremental one
+DEFAULT_INCREMENTAL_MAX_CHANGE = 0.5
+# JD tokens sent with an incremental re-analysis, packed by relevance to the edit
+INCREMENTAL_JD_TOKENS = 800
+# Completion tokens for an incremental re-analysis, before adding the size of the edit
+INCREMENTAL_BASE_TOKENS = 400
+
+
+def create_groq_client(api_key, base_url=None):
+    """Create a Groq client, importing groq lazily.
+
+    ``base_url`` points the client at a compatible stand-in (see benchmark.py).
+    The SDK's own retries are off; resilience.call retries with the shared limiter.
+    """
+    from groq import Groq
+    return Groq(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def pdf_limits():
+    """Return ``(max_pages, token_budget)`` for extraction; a budget of 0 means no budget."""
+    return int(os.environ.get("PDF_MAX_PAGES", 50)), int(os.environ.get("PDF_TOKEN_BUDGET", 0))
+
+
+def pdf_text_namespace():
+    """Cache namespace covering parser version and limits, so changes do not serve stale text."""
+    max_pages, token_budget = pdf_limits()
+    return f"{pdf_extract.parser_version()}:{max_pages}:{token_budget}"
+
+
+def upload_limits():
+    """Return ``(max_bytes, max_document_pages)``: PDFs beyond either are refused before parsing."""
+    return (
+        int(float(os.environ.get("PDF_MAX_UPLOAD_MB", 10)) * 1024 * 1024),
+        int(os.environ.get("PDF_MAX_DOCUMENT_PAGES", 200)),
+    )
+
+
+def extract_pdf_text(pdf_bytes, parallel=True):
+    """Extract text from PDF bytes; returns ``(text, pages)`` and raises on unreadable or oversized files."""
+    max_pages, token_budget = pdf_limits()
+    max_bytes, max_document_pages = upload_limits()
+    return pdf_extract.extract_text(
+        pdf_bytes, max_pages=max_pages, token_budget=token_budget, parallel=parallel,
+        max_bytes=max_bytes, max_document_pages=max_document_pages
+    )
+
+
+DOCUMENT_SUFFIXES = (".pdf", ".txt", ".md")
+
+
+def read_document(path):
+    """Read a PDF (through extract_pdf_text, so its size and page caps apply) or a UTF-8 text file.
+
+    Raises if the file is missing or unreadable.
+    """
+    if not path.lower().endswith(".pdf"):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        text, _ = extract_pdf_text(f.read(), parallel=False)
+    return text
+
+
+def discover_files(paths):
+    """Expand files and directories into a sorted list of document paths (see DOCUMENT_SUFFIXES)."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(
+                    os.path.join(root, name) for name in names if name.lower().endswith(DOCUMENT_SUFFIXES)
+                )
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def scrape_company_info(url):
+    """Scrape company website for basic information; raises on failure."""
+    import scraper  # Imported lazily: pulls in requests and bs4
+    company_info = scraper.scrape_company(url)
+    return {key: clean_html(value) for key, value in company_info.items()}
+
+
+_company_store = None
+_company_store_lock = threading.Lock()
+
+
+def company_profiles():
+    """Return the process-wide company profile store (see company_store.py)."""
+    global _company_store
+    with _company_store_lock:
+        if _company_store is None:
+            _company_store = company_store.store_from_env(scrape_company_info)
+        return _company_store
+
+
+def fetch_company_info(url):
+    """Return the company's profile, scraping its website only if no usable profile is stored.
+
+    Raises on failure, including company_store.CompanyUnavailable while a
+    recent failure of the site is remembered.
+    """
+    return company_profiles().get(url)
+
+
+def clean_html(raw_html):
+    """Remove HTML tags from a string"""
+    cleanr = re.compile('<.*?>')
+    cleantext = re.sub(cleanr, '', raw_html)
+    return cleantext
+
+
+def extract_match_score(analysis_text):
+    """Extract the match score percentage from markdown analysis text, or None if absent."""
+    # First try the specific format we requested
+    specific_match = re.search(r'## Match Score:\s*(\d+)%', analysis_text)
+    if specific_match:
+        return int(specific_match.group(1))
+    
+    # Fallback to more general pattern
+    general_match = re.search(r'Match Score.*?(\d+)%', analysis_text)
+    if general_match:
+        return int(general_match.group(1))
+    
+    return None
+
+
+def keyword_report(resume_text, jd_text, route=None):
+    """Scan both documents for taxonomy skills, or return None if the route has no keyword sections."""
+    route = route or DEFAULT_ROUTE
+    if not any(key in route.sections for key in KEYWORD_SECTIONS):
+        return None
+    return skills.compare(resume_text, jd_text)
+
+
+def _model_sections(route, keywords):
+    if keywords is None:
+        return route.sections, ""
+    # The model gets the scan as context and leaves the keyword sections to apply_keywords
+    return tuple(key for key in route.sections if key not in KEYWORD_SECTIONS), skills.hint_text(keywords)
+
+
+def apply_keywords(result, keywords, route=None):
+    """Fill the route's keyword sections of ``result`` from a keyword_report."""
+    if keywords is None or result.error:
+        return result
+    route = route or DEFAULT_ROUTE
+    missing, overused = skills.keyword_items(keywords, KEYWORD_ITEMS)
+    if not missing and keywords.matched:
+        # Say so rather than dropping the card
+        missing = [(skills.coverage(keywords), None)]
+    lists = {"missing_keywords": missing, "overused_terms": overused}
+    return analysis_result.with_keywords(result, {key: lists[key] for key in KEYWORD_SECTIONS if key in route.sections})
+
+
+def _company_context(company_info, about_text):
+    if not company_info:
+        return ""
+    return f"""
+        Company Context:
+        - Name: {company_info['name']}
+        - Description: {company_info['description']}
+        - About: {about_text}
+        """
+
+
+def build_analysis_prompt(jd_text, resume_text, company_info=None, output_format="json", route=None, keywords=None):
+    """Build the analysis prompt for a JD/resume pair.
+
+    ``output_format`` is "json" (see analysis_result.json_instructions) or
+    "markdown", whose ``##`` sections can be rendered while streaming.
+    ``route`` selects the sections to ask for (default: all of them). With
+    ``keywords`` (a keyword_report) the keyword sections are left out and
+    the scan is passed as a hint; fill them in with apply_keywords.
+    """
+    route = route or DEFAULT_ROUTE
+    sections, keyword_hint = _model_sections(route, keywords)
+    # Pack the most relevant content into the token budget instead of slicing by characters
+    about_text = company_info['about'] if company_info else ""
+    jd_text, resume_text, about_text = prompt_builder.fit_to_budget(jd_text, resume_text, about_text)
+    
+    company_context = _company_context(company_info, about_text)
+    
+    if output_format == "json":
+        output_instructions = analysis_result.json_instructions(sections, route.max_items)
+    else:
+        output_instructions = analysis_result.markdown_instructions(sections, route.max_items)
+    
+    prompt = f"""
+    Analyze this job description and resume pair. First, calculate and provide a Match Score between 0-100% 
+    based on how well the resume matches the job requirements. Then provide specific, actionable suggestions.
+    
+    {company_context}
+
+    Job Description:
+    {jd_text}
+
+    Resume:
+    {resume_text}
+
+    {keyword_hint}
+
+    {output_instructions}
+    """
+    return prompt
+
+
+def request_tokens(prompt, route):
+    """Estimated rate-limit cost of a request: its prompt plus the completion limit."""
+    return prompt_builder.estimate_tokens(prompt) + route.max_tokens
+
+
+def request_analysis(prompt, client, cache, use_cache=True, route=None, hedge=False, previous=None):
+    """Run a JSON-format prompt through the response cache and Groq.
+
+    ``route`` picks the model and token limit (default: DEFAULT_ROUTE);
+    with ``hedge`` a backup request is sent if the call runs unusually long.
+    With ``previous``, the response is a partial update merged into it.
+    Returns ``(result, usage, cached)`` where ``result`` is an
+    AnalysisResult; failed requests come back with ``result.error`` set.
+    Concurrent identical requests share one call; the callers that waited
+    on another's call get ``cached=True``. Safe to call from worker threads.
+    """
+    route = route or DEFAULT_ROUTE
+    cache_key = cache.key_for(prompt, route.model, GROQ_TEMPERATURE, route.max_tokens)
+    
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached:
+            text, usage = cached
+            return analysis_result.parse_analysis(text), usage, True
+    
+    def create():
+        return client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=route.model,
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=route.max_tokens,
+            response_format={"type": "json_object"},
+            stream=False
+        )
+    
+    def call():
+        return resilience.call(create, request_tokens(prompt, route))
+    
+    def fetch():
+        try:
+            # Incremental calls run with a lower max_tokens, so they are tracked apart from full analyses
+            key = routing.latency_key(route)
+            response = routing.hedged(key, call) if hedge else routing.timed(key, call)
+        except Exception as e:
+            return analysis_result.error_result(f"API Error: {str(e)}"), {}
+        text = response.choices[0].message.content
+        usage = llm_cache.usage_to_dict(response.usage)
+        result = analysis_result.parse_json_response(text or "", previous)
+        if result is None:
+            # Not cached, so the next attempt asks the model again
+            truncated = getattr(response.choices[0], "finish_reason", None) == "length"
+            metrics.REGISTRY.inc("analysis_invalid_json_total", truncated=str(truncated).lower())
+            reason = "was cut off at the token limit" if truncated else "was not valid JSON"
+            return analysis_result.error_result(f"API Error: the model's answer {reason}; please try again"), usage
+        cache.put(cache_key, route.model, analysis_result.to_json(result), usage)
+        return result, usage
+    
+    try:
+        (result, usage), shared = singleflight.ANALYSES.do(cache_key, fetch)
+    except TimeoutError as e:
+        return analysis_result.error_result(f"API Error: {str(e)}"), {}, False
+    return result, usage, shared
+
+
+def analysis_context(company_info=None, route=None, keywords=None):
+    """Everything besides the two documents that shapes an analysis, as a near-duplicate index context."""
+    route = route or DEFAULT_ROUTE
+    payload = json.dumps(
+        [route.model, route.max_tokens, list(route.sections), route.max_items, company_info, keywords is not None],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def similar_analysis(resume_text, jd_text, company_info=None, route=None, keywords=None):
+    """Return ``(result, usage, similarity)`` of a near-identical pair analyzed before, or None.
+
+    The result is the model's part; apply_keywords still fills the keyword sections.
+    """
+    index = neardup.shared()
+    if index is None:
+        return None
+    match = index.lookup(resume_text, jd_text, analysis_context(company_info, route, keywords))
+    if match is None:
+        return None
+    return analysis_result.parse_analysis(match.result), match.usage, match.similarity
+
+
+def remember_analysis(resume_text, jd_text, result, usage, company_info=None, route=None, keywords=None):
+    """Store a successful analysis (before apply_keywords) for similar_analysis."""
+    index = neardup.shared()
+    if index is None or result.error:
+        return
+    context = analysis_context(company_info, route, keywords)
+    index.add(resume_text, jd_text, context, analysis_result.to_json(result), usage)
+
+
+def analyze_pair(jd_text, resume_text, client, cache, company_info=None, use_cache=True, route=None, hedge=False,
+                 map_reduce=False):
+    """Analyze one resume/JD pair, reusing the analysis of a near-identical pair if there is one.
+
+    With ``map_reduce``, documents too long for one prompt are analyzed in
+    parts (see map_reduce_prompt). Returns ``(result, usage, cached)`` like
+    request_analysis, with the keyword sections filled locally.
+    """
+    keywords = keyword_report(resume_text, jd_text, route)
+    similar = similar_analysis(resume_text, jd_text, company_info, route, keywords) if use_cache else None
+    if similar is not None:
+        result, usage, _ = similar
+        return apply_keywords(result, keywords, route), usage, True
+    map_usage, map_cached = {}, True
+    if map_reduce and needs_map_reduce(jd_text, resume_text):
+        try:
+            prompt, map_usage, map_cached, _ = map_reduce_prompt(
+                jd_text, resume_text, client, cache, company_info, use_cache, route=route, keywords=keywords
+            )
+        except Exception as e:
+            return analysis_result.error_result(f"API Error: {str(e)}"), {}, False
+    else:
+        prompt = build_analysis_prompt(jd_text, resume_text, company_info, route=route, keywords=keywords)
+    result, usage, cached = request_analysis(prompt, client, cache, use_cache, route=route, hedge=hedge)
+    if map_usage:
+        usage = combine_usage(map_usage, usage)
+    cached = cached and map_cached
+    if not cached:
+        remember_analysis(resume_text, jd_text, result, usage, company_info, route, keywords)
+    return apply_keywords(result, keywords, route), usage, cached
+
+
+def combine_usage(*usages):
+    """Sum the token counts of several calls' usage dicts (Groq timings are dropped)."""
+    total = {}
+    for usage in usages:
+        for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if (usage or {}).get(field) is not None:
+                total[field] = total.get(field, 0) + usage[field]
+    return total
+
+
+def needs_map_reduce(jd_text, resume_text):
+    """Whether the documents exceed PROMPT_TOKEN_BUDGET together, so a single prompt would drop parts of them."""
+    budget = int(os.environ.get("PROMPT_TOKEN_BUDGET", prompt_builder.DEFAULT_TOKEN_BUDGET))
+    needed = sum(
+        prompt_builder.estimate_tokens(prompt_builder.clean_document(text or "")) for text in (jd_text, resume_text)
+    )
+    return needed > budget
+
+
+def build_map_prompt(document, chunk, number, total, other_document, other_text):
+    """Build the prompt reviewing part ``number`` of ``total`` of one document against the other."""
+    prompt = f"""
+    You are reviewing part {number} of {total} of a {document} for a resume/job match analysis.
+    The most relevant parts of the {other_document} are included for reference.
+
+    {document.capitalize()} (part {number} of {total}):
+    {chunk}
+
+    {other_document.capitalize()} (relevant parts):
+    {other_text}
+
+    Respond with a single JSON object and nothing else, using exactly these keys:
+    {{
+      "matches": ["<job requirement the resume meets, with the resume evidence>", ...],
+      "gaps": ["<job requirement the resume does not show>", ...],
+      "improvements": ["<specific change to the resume that would strengthen the match>", ...]
+    }}
+    Only cover what this part shows. Give at most {MAP_NOTE_ITEMS} short items per list.
+    Do not include HTML or markdown.
+    """
+    return prompt
+
+
+def request_notes(prompt, client, cache, use_cache=True, route=None):
+    """Run a map prompt through the response cache and Groq; returns ``(notes, usage, cached)``.
+
+    ``notes`` is the dict from analysis_result.parse_notes. Raises on API errors.
+    """
+    route = route or DEFAULT_ROUTE
+    cache_key = cache.key_for(prompt, route.model, GROQ_TEMPERATURE, MAP_MAX_TOKENS)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached:
+            text, usage = cached
+            return analysis_result.parse_notes(text), usage, True
+    
+    def create():
+        return client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=route.model,
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=MAP_MAX_TOKENS,
+            response_format={"type": "json_object"},
+            stream=False
+        )
+    
+    tokens = prompt_builder.estimate_tokens(prompt) + MAP_MAX_TOKENS
+    # Not timed: these short answers would lower the hedge delay of full analyses (see routing.latency_key)
+    response = resilience.call(create, tokens)
+    text = response.choices[0].message.content
+    usage = llm_cache.usage_to_dict(response.usage)
+    cache.put(cache_key, route.model, text, usage)
+    return analysis_result.parse_notes(text), usage, False
+
+
+def build_reduce_prompt(notes, company_info=None, jd_text="", output_format="json", route=None, keywords=None):
+    """Build the prompt merging per-chunk ``notes`` (``(label, notes)`` pairs) into the usual analysis."""
+    route = route or DEFAULT_ROUTE
+    sections, keyword_hint = _model_sections(route, keywords)
+    about_text = ""
+    if company_info:
+        about_text = prompt_builder.pack_sections(
+            prompt_builder.clean_document(company_info['about']), REDUCE_ABOUT_TOKENS, jd_text
+        )
+    company_context = _company_context(company_info, about_text)
+    review = "\n\n".join(
+        f"{label}:\n" + "\n".join(f"- {key}: {item}" for key in analysis_result.NOTE_KEYS for item in part[key])
+        for label, part in notes
+        if any(part.values())
+    )
+    
+    if output_format == "json":
+        output_instructions = analysis_result.json_instructions(sections, route.max_items)
+    else:
+        output_instructions = analysis_result.markdown_instructions(sections, route.max_items)
+    
+    prompt = f"""
+    Analyze this job description and resume pair. Both were too long for one review, so each part was
+    reviewed separately; the notes below cover every part of both documents. First, calculate and provide
+    a Match Score between 0-100% based on how well the resume matches the job requirements. Then provide
+    specific, actionable suggestions, merging overlapping notes.
+    
+    {company_context}
+
+    Notes from each part:
+    {review}
+
+    {keyword_hint}
+
+    {output_instructions}
+    """
+    return prompt
+
+
+def map_reduce_prompt(jd_text, resume_text, client, cache, company_info=None, use_cache=True, route=None,
+                      keywords=None, output_format="json"):
+    """Review every chunk of both documents in parallel and build the reduce prompt from the notes.
+
+    Documents are split on section boundaries into MAPREDUCE_CHUNK_TOKENS
+    chunks and reviewed by at most MAPREDUCE_WORKERS concurrent calls, so
+    the map step takes about as long as its slowest chunk. Returns
+    ``(prompt, usage, cached, chunks)``: the prompt for request_analysis or
+    stream_analysis (per ``output_format``), the summed usage of the map
+    calls, whether all of them came from the cache, and the chunk count.
+    Raises the first map error.
+    """
+    chunk_tokens = int(os.environ.get("MAPREDUCE_CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS))
+    max_workers = int(os.environ.get("MAPREDUCE_WORKERS", DEFAULT_MAP_WORKERS))
+    documents = {
+        "job description": prompt_builder.clean_document(jd_text or ""),
+        "resume": prompt_builder.clean_document(resume_text or ""),
+    }
+    tasks = []
+    for document, other_document in (("job description", "resume"), ("resume", "job description")):
+        chunks = prompt_builder.chunk_document(documents[document], chunk_tokens)
+        for number, chunk in enumerate(chunks, start=1):
+            other_text = prompt_builder.pack_sections(documents[other_document], MAP_CONTEXT_TOKENS, chunk)
+            label = f"{document.capitalize()}, part {number} of {len(chunks)}"
+            tasks.append((label, build_map_prompt(document, chunk, number, len(chunks), other_document, other_text)))
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        outcomes = list(executor.map(lambda task: request_notes(task[1], client, cache, use_cache, route), tasks))
+    notes = [(label, part) for (label, _), (part, _, _) in zip(tasks, outcomes)]
+    usage = combine_usage(*(usage for _, usage, _ in outcomes))
+    cached = all(cached for _, _, cached in outcomes)
+    prompt = build_reduce_prompt(notes, company_info, documents["job description"], output_format, route, keywords)
+    return prompt, usage, cached, len(tasks)
+
+
+def build_incremental_prompt(jd_text, previous_result, diff, route=None, keywords=None):
+    """Build a prompt updating ``previous_result`` for the sections changed in ``diff``.
+
+    Only the edit, the previous analysis and the JD parts most relevant to
+    the edit are sent, so the prompt grows with the edit, not the resume.
+    """
+    route = route or DEFAULT_ROUTE
+    reference = "\n".join(diff.added) or "\n".join(diff.removed)
+    jd_text = prompt_builder.pack_sections(prompt_builder.clean_document(jd_text), INCREMENTAL_JD_TOKENS, reference)
+    removed = "\n\n".join(diff.removed) or "(none)"
+    added = "\n\n".join(diff.added) or "(none)"
+    sections, keyword_hint = _model_sections(route, keywords)
+    output_instructions = analysis_result.json_instructions(sections, route.max_items)
+    
+    prompt = f"""
+    A resume was analyzed against this job description and has since been edited. Update the analysis
+    for the edit: recalculate the Match Score for the edited resume and revise only the advice the edit affects.
+
+    Job Description (most relevant parts):
+    {jd_text}
+
+    Previous analysis:
+    {analysis_result.to_json(previous_result)}
+
+    Resume sections removed or replaced by the edit:
+    {removed}
+
+    Resume sections added or rewritten by the edit:
+    {added}
+
+    {keyword_hint}
+
+    {output_instructions}
+    Always include match_score and score_justification. Include a list key only if the edit changes it,
+    with its complete new list; leave out keys whose previous list still applies.
+    """
+    return prompt
+
+
+def request_incremental_analysis(previous_resume, previous_result, resume_text, jd_text, client, cache,
+                                 use_cache=True, route=None, hedge=False, keywords=None):
+    """Re-analyze an edited resume by sending only what changed since ``previous_result``.
+
+    Returns ``(result, usage, cached, diff)``, or None when a full analysis
+    should run instead: the previous one failed, the edit covers more than
+    INCREMENTAL_MAX_CHANGE of the resume, or nothing changed and ``use_cache``
+    is off.
+    """
+    if previous_result.error:
+        return None
+    diff = prompt_builder.diff_sections(previous_resume, resume_text)
+    if not diff.removed and not diff.added:
+        return (previous_result, {}, True, diff) if use_cache else None
+    max_change = float(os.environ.get("INCREMENTAL_MAX_CHANGE", DEFAULT_INCREMENTAL_MAX_CHANGE))
+    if diff.changed_tokens > max_change * max(diff.total_tokens, 1):
+        return None
+    
+    route = route or DEFAULT_ROUTE
+    # The answer is a partial update, so size the completion limit by the edit
+    route = route._replace(max_tokens=min(route.max_tokens, INCREMENTAL_BASE_TOKENS + diff.changed_tokens))
+    prompt = build_incremental_prompt(jd_text, previous_result, diff, route, keywords)
+    result, usage, cached = request_analysis(
+        prompt, client, cache, use_cache, route=route, hedge=hedge, previous=previous_result
+    )
+    return result, usage, cached, diff
+
+
+class StreamError(Exception):
+    """Raised while iterating a stream whose analysis failed; the message is the error to show."""
+
+
+def stream_analysis(prompt, client, cache, use_cache=True, on_usage=None, route=None):
+    """Stream a markdown-format prompt through the response cache and Groq, yielding text deltas.
+
+    Raises StreamError if the request fails, also after some text was yielded.
+    ``on_usage(usage, cached)`` is called once the token usage is known.
+    Streams are not hedged: a backup could only restart the stream. While an
+    identical stream is in flight, this waits for it and yields its result
+    in one piece.
+    """
+    route = route or DEFAULT_ROUTE
+    cache_key = cache.key_for(prompt, route.model, GROQ_TEMPERATURE, route.max_tokens)
+    
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached:
+            text, usage = cached
+            if on_usage:
+                on_usage(usage, True)
+            yield analysis_result.to_markdown(analysis_result.parse_analysis(text))
+            return
+    
+    call, leader = singleflight.ANALYSES.begin(cache_key)
+    if not leader:
+        try:
+            result, usage = singleflight.ANALYSES.wait(call)
+        except Exception as e:
+            raise StreamError(f"API Error: {str(e)}") from e
+        if result.error:
+            raise StreamError(result.error)
+        if on_usage:
+            on_usage(usage, True)
+        yield analysis_result.to_markdown(result)
+        return
+    
+    # Published to waiters in the finally block, also if the stream is abandoned
+    outcome = None
+    try:
+        parts = []
+        usage = None
+        try:
+            # Only opening the stream is retried; a stream that fails midway is not
+            stream = resilience.call(
+                lambda: client.chat.completions.create(
+                    messages=[{"role": "user", "content": prompt}],
+                    model=route.model,
+                    temperature=GROQ_TEMPERATURE,
+                    max_tokens=route.max_tokens,
+                    stream=True
+                ),
+                request_tokens(prompt, route),
+            )
+            for chunk in stream:
+                # Groq reports token usage on the final chunk
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                    usage = x_groq.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            outcome = (analysis_result.error_result(f"API Error: {str(e)}"), {})
+            raise StreamError(outcome[0].error) from e
+        
+        usage = llm_cache.usage_to_dict(usage)
+        if usage.get("total_tokens") is not None:
+            limiter, _ = resilience.shared()
+            limiter.refund(request_tokens(prompt, route) - usage["total_tokens"])
+        result = analysis_result.from_markdown_sections("".join(parts).split("\n## "))
+        cache.put(cache_key, route.model, analysis_result.to_json(result), usage)
+        outcome = (result, usage)
+        if on_usage:
+            on_usage(usage, False)
+    finally:
+        error = None if outcome else RuntimeError("The identical request was abandoned before it finished")
+        singleflight.ANALYSES.finish(cache_key, call, result=outcome, error=error)
+
+
+def analyze_jobs_concurrently(resume_text, jobs, client, cache, company_info=None, use_cache=True, max_workers=4,
+                              route=None, hedge=False, map_reduce=False):
+    """Analyze one resume against many job descriptions in parallel.
+
+    ``jobs`` is a list of ``(name, jd_text)`` pairs. Returns one result dict
+    per job, ranked by match score (best first, jobs without a score last);
+    its ``index`` is the job's position in ``jobs``.
+    """
+    def analyze(index, name, jd_text):
+        start = time.perf_counter()
+        result, usage, cached = analyze_pair(
+            jd_text, resume_text, client, cache, company_info, use_cache, route=route, hedge=hedge,
+            map_reduce=map_reduce
+        )
+        return {
+            "index": index,
+            "name": name,
+            "analysis": result,
+            "score": result.score,
+            "seconds": time.perf_counter() - start,
+            "tokens": usage.get("total_tokens"),
+            "cached": cached,
+        }
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(analyze, index, name, jd_text) for index, (name, jd_text) in enumerate(jobs)]
+        for future in as_completed(futures):
+            results.append(future.result())
+    
+    results.sort(key=lambda result: -1 if result["score"] is None else result["score"], reverse=True)
+    return results
+
+
+def _job_company_info(payload, notes):
+    if not payload.get("company_url"):
+        return None
+    try:
+        return fetch_company_info(payload["company_url"])
+    except Exception as e:
+        notes.append(f"Error scraping company website: {str(e)}")
+        return None
+
+
+def single_analysis_job(payload, client, cache):
+    """Job handler (see job_queue.py) analyzing one JD; raises if the analysis failed.
+
+    Returns the JSON-serializable result dict, token usage and notes.
+    """
+    route = routing.Route(**payload["route"])
+    notes = []
+    company_info = _job_company_info(payload, notes)
+    result, usage, cached = analyze_pair(
+        payload["jd_text"], payload["resume_text"], client, cache, company_info, payload["use_cache"],
+        route=route, hedge=payload["hedge"], map_reduce=payload.get("map_reduce", False)
+    )
+    if result.error:
+        raise RuntimeError(result.error)
+    return {"result": analysis_result.to_dict(result), "usage": {"usage": usage, "cached": cached}, "notes": notes}
+
+
+def batch_analysis_job(payload, client, cache):
+    """Job handler analyzing many JDs; failed jobs keep their error next to the result dict."""
+    route = routing.Route(**payload["route"])
+    notes = []
+    company_info = _job_company_info(payload, notes)
+    start = time.perf_counter()
+    results = analyze_jobs_concurrently(
+        payload["resume_text"], [tuple(job) for job in payload["jobs"]], client, cache, company_info,
+        use_cache=payload["use_cache"], max_workers=payload["max_workers"], route=route, hedge=payload["hedge"],
+        map_reduce=payload.get("map_reduce", False)
+    )
+    return {
+        "results": [
+            dict(result, analysis=analysis_result.to_dict(result["analysis"]), error=result["analysis"].error)
+            for result in results
+        ],
+        "seconds": time.perf_counter() - start,
+        "notes": notes,
+    }
+
+
+def split_pasted_jobs(text):
+    """Split pasted job descriptions on lines containing only ``---``."""
+    blocks = re.split(r'^\s*---+\s*$', text, flags=re.MULTILINE)
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def iter_analysis_sections(chunks):
+    """Yield sections of a streamed analysis as soon as each one is complete.
+
+    Sections are split exactly like ``text.split("\n## ")`` would split the
+    full response, so they can be passed to analysis_result.from_markdown_sections.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        # Only a full "\n## " marker closes a section; a partial one stays buffered
+        *complete, buffer = buffer.split("\n## ")
+        for section in complete:
+            yield section
+    yield buffer
+
+
+def split_analysis_section(section):
+    """Split a section into its title line and body."""
+    if '\n' in section:
+        title, content = section.split('\n', 1)
+    else:
+        title = section
+        content = ""
+    return title, content
@@ -0,0 +1,296 @@
+"""Structured analysis results and parsers for JSON and markdown responses.
+
+Analyses are requested as a JSON object (see json_instructions) and parsed
+once into an ``AnalysisResult``. Streamed responses, and responses cached
+before the JSON format, use the markdown section format and go through
+``from_markdown_sections`` instead. Results are cached in the compact
+form produced by ``to_json``, which ``parse_analysis`` reads back directly.
+"""
+import json
+import re
+from collections import namedtuple
+
+AnalysisResult = namedtuple(
+    "AnalysisResult",
+    ["score", "justification", "sections", "missing_keywords", "overused_terms", "error"],
+    defaults=(None,),
+)
+AnalysisResult.__doc__ = """Parsed analysis.
+
+``score`` is an int from 0 to 100, or None when the response had no
+usable score. ``sections`` is a tuple of ``(title, content)`` pairs in
+display order, excluding the match score. ``error`` is set instead of
+the other fields when the request failed.
+"""
+
+# (JSON key, display title, markdown title keyword) in display order
+SECTIONS = (
+    ("company_recommendations", "Company-Specific Recommendations", "Recommendation"),
+    ("missing_keywords", "Top 3 Missing Keywords", "Missing"),
+    ("overused_terms", "Top 3 Overused Terms", "Overused"),
+    ("skills_gaps", "Skills Gap Analysis", "Gap"),
+    ("content_improvements", "Specific Content Improvements", "Improvement"),
+    ("action_items", "Suggested Action Items", "Action"),
+)
+
+SECTION_KEYS = tuple(key for key, _, _ in SECTIONS)
+
+# JSON value placeholder shown to the model for each section
+SECTION_SCHEMA = {
+    "company_recommendations": '["<company-specific recommendation>", ...]',
+    "missing_keywords": '["<keyword>", "<keyword>", "<keyword>"]',
+    "overused_terms": '["<term>", "<term>", "<term>"]',
+    "skills_gaps": '["<skills gap>", ...]',
+    "content_improvements": '["<specific content improvement>", ...]',
+    "action_items": '["<suggested action item>", ...]',
+}
+
+
+def _item_limit(max_items):
+    return f" Give at most {max_items} items per section." if max_items else ""
+
+
+def json_instructions(sections=SECTION_KEYS, max_items=None):
+    """Describe the JSON object the model should return, limited to ``sections``."""
+    keys = [
+        '"match_score": <integer 0-100, how well the resume matches the job requirements>',
+        '"score_justification": "<one or two sentences>"',
+    ]
+    keys.extend(f'"{key}": {SECTION_SCHEMA[key]}' for key in sections)
+    schema = ",\n".join(f"      {key}" for key in keys)
+    return (
+        "Respond with a single JSON object and nothing else, using exactly these keys:\n"
+        f"    {{\n{schema}\n    }}\n"
+        "    Every list item is one plain-text sentence or phrase." + _item_limit(max_items)
+        + " Do not include HTML or markdown."
+    )
+
+
+def markdown_instructions(sections=SECTION_KEYS, max_items=None):
+    """Describe the ``##`` section format used for streamed responses, limited to ``sections``."""
+    titles = [title for key, title, _ in SECTIONS if key in sections]
+    lines = ["1. Match Score (0-100%) with justification - format exactly as: '## Match Score: X%' where X is the score"]
+    lines.extend(f"{number}. {title}" for number, title in enumerate(titles, start=2))
+    return (
+        "Provide your analysis with these sections:\n"
+        + "\n".join(f"    {line}" for line in lines)
+        + "\n\n    Format with clear section headers (##) and bullet points." + _item_limit(max_items)
+        + " Do not include any HTML tags in your response."
+    )
+
+
+TAG_RE = re.compile(r'<.*?>')
+SCORE_RE = re.compile(r'(\d{1,3})\s*%')
+BULLET_RE = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+
+
+def error_result(message):
+    return AnalysisResult(None, "", (), (), (), error=message)
+
+
+def _clean(text):
+    return TAG_RE.sub('', text or "").strip()
+
+
+def _score(value):
+    try:
+        score = int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+    return score if 0 <= score <= 100 else None
+
+
+def _items(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return ()
+    return tuple(item for item in (_clean(str(item)) for item in value) if item)
+
+
+def _bullets(items):
+    return "\n".join(f"- {item}" for item in items)
+
+
+def bullet_items(content):
+    """Return the items of a markdown bullet or numbered list (comma-separated text as a fallback)."""
+    items = []
+    for line in content.splitlines():
+        if BULLET_RE.match(line):
+            items.append(BULLET_RE.sub('', line).replace("**", "").strip())
+    if not items and content.strip():
+        items = [item.strip() for item in content.replace("\n", ",").split(",")]
+    return tuple(item for item in items if item)
+
+
+def from_json(data):
+    """Build a result from the model's JSON object or a cached ``to_json`` object."""
+    if "sections" in data:
+        return AnalysisResult(
+            _score(data.get("score")),
+            data.get("justification", ""),
+            tuple((title, content) for title, content in data["sections"]),
+            tuple(data.get("missing_keywords", ())),
+            tuple(data.get("overused_terms", ())),
+        )
+    lists = {key: _items(data.get(key)) for key, _, _ in SECTIONS}
+    return AnalysisResult(
+        _score(data.get("match_score")),
+        _clean(str(data.get("score_justification", ""))),
+        tuple((title, _bullets(lists[key])) for key, title, _ in SECTIONS if lists[key]),
+        lists["missing_keywords"],
+        lists["overused_terms"],
+    )
+
+
+def from_markdown_sections(sections):
+    """Build a result from a markdown response already split at ``\\n## `` markers."""
+    score = None
+    justification = ""
+    kept = []
+    lists = {}
+    for section in sections:
+        section = _clean(section)
+        if not section:
+            continue
+        title, _, content = section.partition("\n")
+        title = title.lstrip("#").strip()
+        content = content.strip()
+        if "Match Score" in title:
+            match = SCORE_RE.search(title) or SCORE_RE.search(content)
+            score = _score(match.group(1)) if match else None
+            justification = content
+            continue
+        kept.append((title, content))
+        for key, _, keyword in SECTIONS:
+            if keyword in title and key not in lists:
+                lists[key] = bullet_items(content)
+                break
+    return AnalysisResult(
+        score,
+        justification,
+        tuple(kept),
+        lists.get("missing_keywords", ()),
+        lists.get("overused_terms", ()),
+    )
+
+
+def _section_key(title):
+    for key, display_title, keyword in SECTIONS:
+        if title == display_title or keyword in title:
+            return key
+    return None
+
+
+def merge_update(previous, data):
+    """Apply a partial model JSON object to a previous result.
+
+    Sections whose key is present replace the previous ones (an empty list
+    drops them); absent keys keep their previous content. The score and
+    justification are always taken from the update when it has them.
+    """
+    update = from_json(data)
+    updated_sections = dict(update.sections)
+    previous_sections = {}
+    extra = []
+    for title, content in previous.sections:
+        key = _section_key(title)
+        if key is None:
+            extra.append((title, content))
+        else:
+            previous_sections.setdefault(key, (title, content))
+    sections = []
+    for key, title, _ in SECTIONS:
+        if key in data:
+            if title in updated_sections:
+                sections.append((title, updated_sections[title]))
+        elif key in previous_sections:
+            sections.append(previous_sections[key])
+    return AnalysisResult(
+        update.score if update.score is not None else previous.score,
+        update.justification or previous.justification,
+        tuple(sections + extra),
+        update.missing_keywords if "missing_keywords" in data else previous.missing_keywords,
+        update.overused_terms if "overused_terms" in data else previous.overused_terms,
+    )
+
+
+def with_keywords(result, lists):
+    """Replace keyword sections with locally computed ones.
+
+    ``lists`` maps section keys (e.g. "missing_keywords") to ``(term, detail)``
+    pairs; each replaces the model's section of that key, and an empty list
+    drops it. A pair without detail is a note, shown but not counted as a
+    term. The result's keyword fields hold the bare terms.
+    """
+    update = {
+        key: [f"{term} ({detail})" if detail else term for term, detail in items] for key, items in lists.items()
+    }
+    terms = {key: tuple(term for term, detail in items if detail) for key, items in lists.items()}
+    return merge_update(result, update)._replace(**terms)
+
+
+def _json_object(text):
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return None
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+# Lists a map step (see analysis.map_reduce_prompt) returns for each document chunk
+NOTE_KEYS = ("matches", "gaps", "improvements")
+
+
+def parse_notes(text):
+    """Parse a map step's JSON response into a dict of NOTE_KEYS to item tuples (empty if unparseable)."""
+    data = _json_object(text) or {}
+    return {key: _items(data.get(key)) for key in NOTE_KEYS}
+
+
+def parse_json_response(text, previous=None):
+    """Parse a response to a JSON-mode request, merged into ``previous`` if given.
+
+    Returns None when the text holds no complete JSON object, e.g. because
+    the answer was cut off at the token limit; the markdown fallback would
+    turn it into a result without a score.
+    """
+    data = _json_object(text)
+    if data is None:
+        return None
+    return from_json(data) if previous is None else merge_update(previous, data)
+
+
+def parse_analysis(text):
+    """Parse a response as JSON, falling back to the markdown section format."""
+    data = _json_object(text)
+    if data is not None:
+        return from_json(data)
+    return from_markdown_sections(text.split("\n## "))
+
+
+def to_dict(result):
+    return {
+        "score": result.score,
+        "justification": result.justification,
+        "sections": [list(section) for section in result.sections],
+        "missing_keywords": list(result.missing_keywords),
+        "overused_terms": list(result.overused_terms),
+    }
+
+
+def to_json(result):
+    """Serialize a result compactly for the response cache."""
+    return json.dumps(to_dict(result), separators=(",", ":"))
+
+
+def to_markdown(result):
+    """Render a result in the markdown section format used for streaming."""
+    score = "unknown" if result.score is None else f"{result.score}%"
+    parts = [f"## Match Score: {score}\n{result.justification}".rstrip()]
+    parts.extend(f"## {title}\n{content}" for title, content in result.sections)
+    return "\n".join(parts)
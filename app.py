@@ -1,14 +1,53 @@
+import time
+
+# Measure cold start from the first line of the script
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
-import PyPDF2
-import io
 import os
 import re
-import requests
-from bs4 import BeautifulSoup
-from groq import Groq
 from dotenv import load_dotenv
-from urllib.parse import urlparse
 import random
+import hashlib
+import textwrap
+import uuid
+import analysis_result
+import job_queue
+import llm_cache
+import metrics
+import neardup
+import pdf_cache
+import routing
+import session_store
+import singleflight
+from analysis import (
+    analyze_jobs_concurrently,
+    apply_keywords,
+    batch_analysis_job,
+    build_analysis_prompt,
+    clean_html,
+    combine_usage,
+    company_profiles,
+    create_groq_client,
+    extract_match_score,
+    extract_pdf_text,
+    fetch_company_info,
+    iter_analysis_sections,
+    keyword_report,
+    map_reduce_prompt,
+    needs_map_reduce,
+    pdf_text_namespace,
+    remember_analysis,
+    request_analysis,
+    request_incremental_analysis,
+    similar_analysis,
+    single_analysis_job,
+    split_analysis_section,
+    split_pasted_jobs,
+    stream_analysis,
+    StreamError,
+    upload_limits,
+)
 
 # Set page config with dark theme
 st.set_page_config(
@@ -18,454 +57,343 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def load_environment():
+    """Load environment variables from .env once per process."""
+    load_dotenv()
+    return True
+
+@st.cache_resource
+def load_stylesheet(path="style.css"):
+    """Read and minify the stylesheet once per process."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), path), "r", encoding="utf-8") as f:
+        css = f.read()
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};:,>])\s*', r'\1', css).strip()
+
+def inject_stylesheet():
+    """Inject the cached stylesheet into the page."""
+    st.markdown(f"<style>{load_stylesheet()}</style>", unsafe_allow_html=True)
+
+@st.cache_resource
+def get_startup_report():
+    """Timings of the first script run in this process, shared by all sessions."""
+    return {}
+
+def record_startup_timing(name, seconds):
+    """Record a timing for this run, and for the process's first run if unset."""
+    report = get_startup_report()
+    report.setdefault(f"first run: {name}", seconds)
+    st.session_state.setdefault("run_timings", {})[name] = seconds
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serve Prometheus metrics once per process if METRICS_PORT is set."""
+    return metrics.serve_from_env()
+
 # Load environment variables
-load_dotenv()
+load_environment()
+start_metrics_endpoint()
 
-# Dark theme CSS with appropriate text colors
-st.markdown("""
-<style>
-    /* Dark theme color scheme */
-    :root {
-        --primary-color: #6C63FF;
-        --secondary-color: #8E85FF;
-        --accent-color: #4A42D1;
-        --background-color: #121212;
-        --card-bg: #1E1E1E;
-        --text-color: #E0E0E0;
-        --text-muted: #A0A0A0;
-        --border-color: #333333;
-    }
-
-    /* Main container styling */
-    .stApp {
-        background-color: var(--background-color);
-        color: var(--text-color);
-<<<<<<< HEAD
-=======
-    }
-
-    /* Header styling */
-    .header {
-        background: linear-gradient(135deg, var(--primary-color), var(--accent-color));
-        padding: 3rem 2rem;
-        border-radius: 1rem;
-        color: white;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.3);
->>>>>>> 991489f1c2ad9699376335c6dc034b7a5e8386a9
-    }
-
-    /* Header styling */
-    .header {
-        background: linear-gradient(135deg, var(--primary-color), var(--accent-color));
-        padding: 3rem 2rem;
-        border-radius: 1rem;
-        color: white;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.3);
-    }
-
-    .header h1 {
-        font-size: 2.5rem;
-        margin-bottom: 1rem;
-        font-weight: 700;
-    }
-
-    .header p {
-        font-size: 1.2rem;
-        opacity: 0.9;
-    }
-<<<<<<< HEAD
-=======
-    
-    /* Sidebar styling */
-    .sidebar-header {
-        padding: 1rem 0;
-        border-bottom: 1px solid #eee;
-        margin-bottom: 1rem;
-    }
-    
-    .sidebar-content {
-        display: flex;
-        flex-direction: column;
-        gap: 1.5rem;
-    }
-    
-    .step {
-        display: flex;
-        gap: 1rem;
-        align-items: flex-start;
-    }
-    
-    .step-number {
-        background: #667eea;
-        color: white;
-        width: 24px;
-        height: 24px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-weight: bold;
-        flex-shrink: 0;
-    }
-    
-    .step-content h4 {
-        margin-bottom: 0.3rem;
-    }
-    
-    .step-content p {
-        font-size: 0.9rem;
-        color: #666;
-        margin: 0;
-    }
-    
-    .sidebar-footer {
-        margin-top: 2rem;
-        padding-top: 1rem;
-        border-top: 1px solid #eee;
-        font-size: 0.9rem;
-    }
->>>>>>> 991489f1c2ad9699376335c6dc034b7a5e8386a9
-
-    /* Card styling */
-    .card {
-        background: var(--card-bg);
-        border-radius: 1rem;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.2);
-        border: 1px solid var(--border-color);
-        color: var(--text-color);
-        transition: transform 0.2s ease;
-    }
-
-    .card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
-    }
-
-    /* Text elements */
-    h1, h2, h3, h4, h5, h6 {
-        color: var(--text-color) !important;
-    }
-
-    p, div {
-        color: var(--text-color) !important;
-    }
-
-    /* Button styling */
-    .stButton>button {
-        background: var(--primary-color);
-        color: white;
-        border-radius: 0.5rem;
-        padding: 0.5rem 1rem;
-        border: none;
-        font-weight: 600;
-        transition: all 0.2s ease;
-    }
-
-    .stButton>button:hover {
-        background: var(--secondary-color);
-        transform: translateY(-1px);
-        color: white !important;
-    }
-
-    /* File uploader styling */
-    .stFileUploader {
-        border: 2px dashed var(--accent-color);
-        border-radius: 0.5rem;
-        padding: 1rem;
-        background: var(--card-bg) !important;
-    }
-<<<<<<< HEAD
-
-    /* Progress bar styling */
-    .progress-bar {
-        background: linear-gradient(90deg, var(--primary-color), var(--secondary-color));
-        border-radius: 1rem;
-        height: 0.5rem;
-    }
-
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: var(--card-bg) !important;
-        border-right: 1px solid var(--border-color) !important;
-    }
-
-    .sidebar-header {
-        padding: 1rem;
-        border-bottom: 1px solid var(--border-color);
-    }
-
-    /* Input fields */
-    .stTextInput>div>div>input, 
-    .stTextArea>div>div>textarea {
-        background: var(--card-bg) !important;
-        color: var(--text-color) !important;
-        border: 1px solid var(--border-color) !important;
-    }
-
-    /* Radio buttons */
-    .stRadio>div {
-        background: var(--card-bg) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 0.5rem;
-        padding: 0.5rem;
-    }
-
-    /* Select slider */
-    .stSelectSlider>div {
-        background: var(--card-bg) !important;
-    }
-
-    /* Checkbox */
-    .stCheckbox>label {
-        color: var(--text-color) !important;
-    }
-
-    /* Animation classes */
-    .fade-in {
-        animation: fadeIn 0.5s ease-in;
-    }
-
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(10px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-
-    /* Responsive design */
-=======
-    
-    .score-emoji {
-        font-size: 1.5rem;
-    }
-
-    .stButton>button:hover {
-        background: var(--secondary-color);
-        transform: translateY(-1px);
-        color: white !important;
-    }
-
-    /* File uploader styling */
-    .stFileUploader {
-        border: 2px dashed var(--accent-color);
-        border-radius: 0.5rem;
-        padding: 1rem;
-        background: var(--card-bg) !important;
-    }
-
-    /* Progress bar styling */
-    .progress-bar {
-        background: linear-gradient(90deg, var(--primary-color), var(--secondary-color));
-        border-radius: 1rem;
-        height: 0.5rem;
-    }
-
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: var(--card-bg) !important;
-        border-right: 1px solid var(--border-color) !important;
-    }
-
-    .sidebar-header {
-        padding: 1rem;
-        border-bottom: 1px solid var(--border-color);
-    }
-
-    /* Input fields */
-    .stTextInput>div>div>input, 
-    .stTextArea>div>div>textarea {
-        background: var(--card-bg) !important;
-        color: var(--text-color) !important;
-        border: 1px solid var(--border-color) !important;
-    }
-
-    /* Radio buttons */
-    .stRadio>div {
-        background: var(--card-bg) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 0.5rem;
-        padding: 0.5rem;
-    }
-
-    /* Select slider */
-    .stSelectSlider>div {
-        background: var(--card-bg) !important;
-    }
-
-    /* Checkbox */
-    .stCheckbox>label {
-        color: var(--text-color) !important;
-    }
-    
-    /* Section headers */
-    .section-header {
-        margin: 2rem 0 1rem;
-    }
-    
-    .section-header h2 {
-        border-bottom: 2px solid #f0f0f0;
-        padding-bottom: 0.5rem;
-    }
-    
-    /* File upload containers */
-    .stContainer {
-        border-radius: 0.5rem;
-        padding: 1.5rem;
-    }
-    
-    /* Responsive adjustments */
->>>>>>> 991489f1c2ad9699376335c6dc034b7a5e8386a9
-    @media (max-width: 768px) {
-        .header {
-            padding: 2rem 1rem;
-        }
-        
-        .header h1 {
-            font-size: 2rem;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+def start_trace(kind):
+    """Begin collecting timing spans for an analysis in this session."""
+    st.session_state["active_trace"] = metrics.Trace(kind)
+
+def current_trace():
+    """Return the trace of the analysis in progress (a throwaway one outside an analysis)."""
+    return st.session_state.get("active_trace") or metrics.Trace("untracked")
 
-def clean_html(raw_html):
-    """Remove HTML tags from a string"""
-    cleanr = re.compile('<.*?>')
-    cleantext = re.sub(cleanr, '', raw_html)
-    return cleantext
+def finish_trace():
+    """Export the finished analysis trace and keep it for the debug panel."""
+    trace = st.session_state.pop("active_trace", None)
+    if trace is None or not trace.spans:
+        return
+    pdf_stats = get_pdf_cache().stats()
+    for name, value in session_store.memory_report(get_artifact_store(), pdf_stats).items():
+        if value is not None:
+            metrics.REGISTRY.set_gauge(name, value)
+    st.session_state["last_trace"] = metrics.record_trace(
+        trace, cache_stats={"pdf": pdf_stats, "llm": get_response_cache().stats()}
+    )
+
+# Dark theme CSS with appropriate text colors
+inject_stylesheet()
 
 def get_company_info(url):
     """Scrape company website for basic information"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract basic company info
-        company_name = soup.find('title').get_text() if soup.find('title') else urlparse(url).netloc
-        description = soup.find('meta', attrs={'name': 'description'})
-        description = description['content'] if description else "No description found"
-        
-        # Try to find about page
-        about_link = None
-        for link in soup.find_all('a', href=True):
-            if 'about' in link['href'].lower():
-                about_link = link['href'] if link['href'].startswith('http') else f"{url.rstrip('/')}/{link['href'].lstrip('/')}"
-                break
-        
-        # Get more details from about page if available
-        about_text = ""
-        if about_link:
-            try:
-                about_response = requests.get(about_link, headers=headers, timeout=10)
-                about_soup = BeautifulSoup(about_response.text, 'html.parser')
-                about_text = about_soup.get_text()[:1000] + "..."  # Limit text length
-            except:
-                about_text = "Could not retrieve additional details"
-        
-        return {
-            "name": clean_html(company_name),
-            "description": clean_html(description),
-            "about": clean_html(about_text),
-            "website": url
-        }
-    except Exception as e:
-        st.error(f"Error scraping company website: {str(e)}")
-        return None
-
-# Initialize Groq client
-try:
+    with current_trace().span("scrape", url=url) as span:
+        try:
+            return fetch_company_info(url)
+        except Exception as e:
+            span["error"] = str(e)
+            st.error(f"Error scraping company website: {str(e)}")
+            return None
 
-    api_key = os.environ.get("GROQ_API_KEY")
-    api_key = os.environ.get("gsjsWf")
+# Read the Groq API key; the client itself is created on first use
+api_key = os.environ.get("GROQ_API_KEY")
 
+if not api_key:
+    st.warning("Please set your GROQ_API_KEY in the .env file or enter it below")
+    api_key = st.text_input("Enter your Groq API key:", type="password")
     if not api_key:
-        st.warning("Please set your GROQ_API_KEY in the .env file or enter it below")
-        api_key = st.text_input("Enter your Groq API key:", type="password")
-        if not api_key:
-            st.stop()
-    
-    client = Groq(api_key=api_key)
-except Exception as e:
-    st.error(f"Failed to initialize Groq client: {str(e)}")
-    st.stop()
+        st.stop()
 
-def extract_text_from_pdf(uploaded_file):
-    """Extract text from uploaded PDF file."""
+@st.cache_resource
+def get_groq_client(api_key):
+    """Create the Groq client once per process and key, importing groq lazily."""
+    import_started = time.perf_counter()
+    client = create_groq_client(api_key)
+    get_startup_report()["create Groq client (lazy import)"] = time.perf_counter() - import_started
+    return client
+
+def groq_client():
+    """Return the shared Groq client, stopping the script if it cannot be created."""
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-        return "\n".join(page.extract_text() for page in pdf_reader.pages)
+        return get_groq_client(api_key)
     except Exception as e:
-        st.error(f"Error reading PDF: {str(e)}")
+        st.error(f"Failed to initialize Groq client: {str(e)}")
+        st.stop()
+
+@st.cache_resource
+def get_pdf_cache():
+    """Create the PDF text cache shared by every session in this process."""
+    return pdf_cache.cache_from_env()
+
+def extract_text_from_pdf(uploaded_file):
+    """Extract text from uploaded PDF file, reusing cached text for identical uploads."""
+    max_bytes, _ = upload_limits()
+    if uploaded_file.size > max_bytes:
+        st.error(f"{uploaded_file.name} is {uploaded_file.size / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.1f} MB")
         return None
+    # The uploader's own buffer: getvalue() on an unmodified BytesIO returns it without copying
+    pdf_bytes = uploaded_file.getvalue()
 
-def extract_match_score(analysis_text):
-    """Extract the match score percentage from the analysis text."""
-    # First try the specific format we requested
-    specific_match = re.search(r'## Match Score:\s*(\d+)%', analysis_text)
-    if specific_match:
-        return int(specific_match.group(1))
-    
-    # Fallback to more general pattern
-    general_match = re.search(r'Match Score.*?(\d+)%', analysis_text)
-    if general_match:
-        return int(general_match.group(1))
-    
-    return 0
-
-def analyze_resume_with_groq(jd_text, resume_text, company_info=None):
-    """Send JD and resume to Groq API for analysis."""
-    company_context = ""
-    if company_info:
-        company_context = f"""
-        Company Context:
-        - Name: {company_info['name']}
-        - Description: {company_info['description']}
-        - About: {company_info['about'][:2000]}
-        """
-    
-    prompt = f"""
-    Analyze this job description and resume pair. First, calculate and provide a Match Score between 0-100% 
-    based on how well the resume matches the job requirements. Then provide specific, actionable suggestions.
-    
-    {company_context}
+    def parse():
+        span["cached"] = False
+        try:
+            text, pages = extract_pdf_text(pdf_bytes)
+        except Exception as e:
+            st.error(f"Error reading PDF: {str(e)}")
+            return None
+        span["pages"] = len(pages)
+        if pages:
+            slowest = max(pages, key=lambda page: page.seconds)
+            st.caption(
+                f"{uploaded_file.name}: extracted {len(pages)} pages in {sum(page.seconds for page in pages):.2f}s "
+                f"(slowest: page {slowest.number + 1}, {slowest.seconds:.2f}s)"
+            )
+        return text
+
+    with current_trace().span("extract", file=uploaded_file.name, cached=True) as span:
+        return get_pdf_cache().get_or_compute(pdf_bytes, parse, namespace=pdf_text_namespace())
 
-    Job Description:
-    {jd_text[:8000]}
+@st.cache_resource
+def get_response_cache():
+    """Create the LLM response cache shared by every session in this process."""
+    return llm_cache.cache_from_env()
 
-    Resume:
-    {resume_text[:8000]}
+def record_analysis_usage(usage, cached):
+    """Remember token usage of the latest analysis for display and metrics."""
+    st.session_state["last_analysis_usage"] = {"usage": usage, "cached": cached}
+    current_trace().record_usage(usage, cached)
 
-    Provide your analysis with these sections:
-    1. Match Score (0-100%) with justification - format exactly as: '## Match Score: X%' where X is the score
-    2. Company-Specific Recommendations
-    3. Top 3 Missing Keywords
-    4. Top 3 Overused Terms
-    5. Skills Gap Analysis
-    6. Specific Content Improvements
-    7. Suggested Action Items
+def scan_keywords(resume_text, jd_text, route=None):
+    """Find the missing and overused skills locally (see skills.py)."""
+    with current_trace().span("keyword scan"):
+        return keyword_report(resume_text, jd_text, route)
 
-    Format with clear section headers (##) and bullet points. Do not include any HTML tags in your response.
+def map_reduce_with_groq(jd_text, resume_text, company_info=None, use_cache=True, route=None, keywords=None,
+                         output_format="json"):
+    """Review long documents in parallel parts; returns ``(reduce_prompt, usage, cached)``.
+
+    See analysis.map_reduce_prompt; raises the first failed part's error.
     """
-    
-    try:
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama3-70b-8192",
-            temperature=0.3,
-            max_tokens=4000,
-            stream=False
+    with current_trace().span("groq (map)", model=route.model if route else None) as span:
+        prompt, usage, cached, chunks = map_reduce_prompt(
+            jd_text, resume_text, groq_client(), get_response_cache(), company_info, use_cache, route=route,
+            keywords=keywords, output_format=output_format
         )
-        return clean_html(response.choices[0].message.content)
-    except Exception as e:
-        return f"API Error: {str(e)}"
+        span.update(chunks=chunks, cached=cached)
+    return prompt, usage, cached
 
-def create_placement_indicator(score):
-    """Create a visual indicator for placement probability."""
-    st.subheader("Resume Match Score")
+def analyze_resume_with_groq(jd_text, resume_text, company_info=None, use_cache=True, route=None, hedge=False,
+                             keywords=None, map_reduce=False):
+    """Send JD and resume to Groq API for analysis; returns an AnalysisResult.
+
+    ``keywords`` (see scan_keywords) fills the keyword sections instead of the model.
+    With ``map_reduce``, documents too long for one prompt are analyzed in parts.
+    """
+    map_usage, map_cached = {}, True
+    if map_reduce and needs_map_reduce(jd_text, resume_text):
+        try:
+            prompt, map_usage, map_cached = map_reduce_with_groq(
+                jd_text, resume_text, company_info, use_cache, route, keywords
+            )
+        except Exception as e:
+            return analysis_result.error_result(f"API Error: {str(e)}")
+    else:
+        with current_trace().span("prompt"):
+            prompt = build_analysis_prompt(jd_text, resume_text, company_info, route=route, keywords=keywords)
+    with current_trace().span("groq", model=route.model if route else None) as span:
+        result, usage, cached = request_analysis(
+            prompt, groq_client(), get_response_cache(), use_cache, route=route, hedge=hedge
+        )
+        span["cached"] = cached
+    if map_usage:
+        usage = combine_usage(map_usage, usage)
+    cached = cached and map_cached
+    if usage or cached:
+        record_analysis_usage(usage, cached)
+    if not cached:
+        remember_analysis(resume_text, jd_text, result, usage, company_info, route, keywords)
+    return apply_keywords(result, keywords, route)
+
+def reuse_similar_analysis(jd_text, resume_text, company_info=None, route=None, keywords=None):
+    """Return ``(result, note)`` from a near-identical pair analyzed before, or None (see neardup.py)."""
+    with current_trace().span("near-duplicate lookup") as span:
+        similar = similar_analysis(resume_text, jd_text, company_info, route, keywords)
+        span["hit"] = similar is not None
+    if similar is None:
+        return None
+    result, usage, similarity = similar
+    record_analysis_usage(usage, True)
+    note = f"Reused the analysis of a {similarity:.0%} similar resume and job description"
+    return apply_keywords(result, keywords, route), note
+
+def reanalyze_with_groq(previous, resume_text, jd_text, use_cache=True, route=None, hedge=False, keywords=None):
+    """Re-analyze only what changed since ``previous``, a ``(resume_text, result)`` pair.
+
+    Returns ``(result, note)``, or None if the edit is too large and a full analysis should run.
+    """
+    with current_trace().span("groq (incremental)", model=route.model if route else None) as span:
+        outcome = request_incremental_analysis(
+            previous[0], previous[1], resume_text, jd_text, groq_client(), get_response_cache(),
+            use_cache=use_cache, route=route, hedge=hedge, keywords=keywords
+        )
+        if outcome is None:
+            span["full_analysis"] = True
+            return None
+        result, usage, cached, diff = outcome
+        span.update(cached=cached, changed_tokens=diff.changed_tokens, total_tokens=diff.total_tokens)
+    if usage or cached:
+        record_analysis_usage(usage, cached)
+    note = (
+        f"Re-analyzed only your edit: {len(diff.added)} new or rewritten section(s), {diff.unchanged} unchanged "
+        f"(~{diff.changed_tokens} of {diff.total_tokens} resume tokens sent)"
+    )
+    return apply_keywords(result, keywords, route), note
+
+def stream_analysis_with_groq(jd_text, resume_text, company_info=None, use_cache=True, route=None, keywords=None,
+                              map_reduce=False):
+    """Stream the Groq analysis, yielding text deltas as they arrive; raises StreamError if it fails.
+
+    With ``map_reduce``, the parts of long documents are reviewed first and only the merge is streamed.
+    """
+    if map_reduce and needs_map_reduce(jd_text, resume_text):
+        try:
+            prompt, map_usage, map_cached = map_reduce_with_groq(
+                jd_text, resume_text, company_info, use_cache, route, keywords, output_format="markdown"
+            )
+        except Exception as e:
+            raise StreamError(f"API Error: {str(e)}") from e
+        
+        def on_usage(usage, cached):
+            record_analysis_usage(combine_usage(map_usage, usage), cached and map_cached)
+    else:
+        with current_trace().span("prompt"):
+            # Markdown sections can be rendered as they arrive; JSON could not
+            prompt = build_analysis_prompt(
+                jd_text, resume_text, company_info, output_format="markdown", route=route, keywords=keywords
+            )
+        on_usage = record_analysis_usage
+    yield from stream_analysis(prompt, groq_client(), get_response_cache(), use_cache, on_usage=on_usage, route=route)
+
+def background_available():
+    """Background jobs run without a session, so they need the key from the environment."""
+    return bool(os.environ.get("GROQ_API_KEY"))
+
+@st.cache_resource
+def get_job_queue():
+    """Start the background job queue and its workers once per process."""
+    client = get_groq_client(os.environ["GROQ_API_KEY"])
+    cache = get_response_cache()
+    queue = job_queue.queue_from_env()
+    queue.register("single", lambda payload: single_analysis_job(payload, client, cache))
+    queue.register("batch", lambda payload: batch_analysis_job(payload, client, cache))
+    queue.start()
+    return queue
+
+@st.cache_resource
+def get_jd_index():
+    """Open the persistent job-description library once per process."""
+    import jd_index
+    return jd_index.index_from_env()
+
+def add_to_library(jd_files):
+    """Extract uploaded JDs and add them to the library, keyed by file name.
+
+    An upload with the name of an entry but other content replaces that
+    entry, so an edited JD does not linger as a stale copy. Returns
+    ``(indexed, replaced)``: how many were new or changed, and the names
+    of the entries replaced.
+    """
+    library = get_jd_index()
+    existing = {entry["key"]: entry["content_hash"] for entry in library.entries()}
+    documents = []
+    replaced = []
+    for jd_file in jd_files:
+        jd_text = extract_text_from_pdf(jd_file)
+        if jd_text:
+            documents.append((jd_file.name, jd_file.name, jd_text))
+            old_hash = existing.get(jd_file.name)
+            if old_hash and old_hash != hashlib.sha256(jd_text.encode("utf-8")).hexdigest():
+                replaced.append(jd_file.name)
+    return library.add_many(documents), replaced
+
+def remove_from_library():
+    """Button callback: drop the entries picked in the library's remove list."""
+    for key in st.session_state.pop("library_remove", []):
+        get_jd_index().remove(key)
+
+@st.cache_resource
+def get_local_scorer():
+    """Load the local (no LLM) match scorer once per process."""
+    import local_score  # Imported lazily: pulls in numpy
+    return local_score.load_scorer()
+
+def html_block(html):
+    """Dedent an HTML snippet so blocks can be joined into one markdown call."""
+    return textwrap.dedent(html).strip()
+
+def create_quick_score_indicator(score):
+    """Show the instant local match score computed without an LLM call."""
+    st.markdown(
+        f"""
+        <div class="card">
+            <div style="display: flex; align-items: center; gap: 10px;">
+                <span style="font-size: 24px;">⚡</span>
+                <h3 style="margin: 0;">Quick Match (local): {score}%</h3>
+            </div>
+            <p style="margin: 5px 0 0 0; color: var(--text-muted) !important;">
+                Keyword-based estimate computed instantly; the AI score below is more thorough.
+            </p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def placement_indicator_html(score):
+    """Build the placement probability card for a match score."""
+    if score is None:
+        return html_block(
+            """
+            <div class="card">
+                <h2 style="margin: 0;">Match Score: unavailable</h2>
+                <p style="margin: 5px 0 0 0;">The analysis did not include a match score.</p>
+            </div>
+            """
+        )
     
     if score >= 80:
         color = "#10B981"  # Green
@@ -493,7 +421,7 @@ def create_placement_indicator(score):
         message = "Poor match - major overhaul required"
         icon = "🚨"
     
-    st.markdown(
+    return html_block(
         f"""
         <div class="card">
             <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
@@ -509,69 +437,548 @@ def create_placement_indicator(score):
                 </div>
             </div>
         </div>
-        """,
-        unsafe_allow_html=True
+        """
     )
 
-def format_analysis_content(analysis_text):
-    """Format the analysis content into styled boxes."""
-    # First remove any HTML tags that might have slipped through
-    clean_text = clean_html(analysis_text)
+def create_placement_indicator(score):
+    """Create a visual indicator for placement probability."""
+    st.subheader("Resume Match Score")
+    st.markdown(placement_indicator_html(score), unsafe_allow_html=True)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def analysis_html(result_json):
+    """Build the score and section cards of a cached analysis as one HTML block."""
+    result = analysis_result.parse_analysis(result_json)
+    cards = [placement_indicator_html(result.score)]
+    cards.extend(analysis_card_html(title, content) for title, content in result.sections)
+    return "\n".join(cards)
+
+def format_analysis_content(result):
+    """Show the score and sections of a parsed analysis in a single markdown call."""
+    st.subheader("Resume Match Score")
+    st.markdown(analysis_html(analysis_result.to_json(result)), unsafe_allow_html=True)
+
+def render_analysis_card(title, content):
+    """Render a single analysis section as a styled card."""
+    st.markdown(analysis_card_html(title, content), unsafe_allow_html=True)
+
+def analysis_card_html(title, content):
+    """Build the styled card for one analysis section."""
+    # Different card styles for different sections
+    if "Recommendations" in title:
+        icon = "💡"
+        border_color = "#6C63FF"
+    elif "Missing" in title:
+        icon = "🔎"
+        border_color = "#4CAF50"
+    elif "Overused" in title:
+        icon = "🔄"
+        border_color = "#FF9800"
+    elif "Gap" in title:
+        icon = "📉"
+        border_color = "#2196F3"
+    elif "Improvements" in title:
+        icon = "🛠️"
+        border_color = "#9C27B0"
+    elif "Action" in title:
+        icon = "✅"
+        border_color = "#00BCD4"
+    else:
+        icon = "📌"
+        border_color = "#607D8B"
     
-    # Split into sections
-    sections = re.split(r'\n## ', clean_text)
+    content_html = content.replace('\n', '<br>')
+    return html_block(
+        f"""
+        <div class="card" style="border-left: 4px solid {border_color};">
+            <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
+                <span style="font-size: 24px;">{icon}</span>
+                <h3 style="margin: 0;">{title}</h3>
+            </div>
+            <div style="color: var(--text-color);">
+                {content_html}
+            </div>
+        </div>
+        """
+    )
+
+def render_streamed_analysis(chunks, keywords=None, route=None):
+    """Render score and cards as each section of a streamed analysis completes.
+
+    The keyword cards from ``keywords`` (see scan_keywords) are shown first,
+    before the model has answered. Returns the parsed AnalysisResult, or an
+    error result if the stream failed.
+    """
+    start = time.perf_counter()
+    first_section_at = None
+    score_placeholder = st.empty()
+    score_shown = False
+    sections = []
+    
+    for title, content in apply_keywords(analysis_result.from_json({}), keywords, route).sections:
+        render_analysis_card(title, content)
     
-    for i, section in enumerate(sections):
-        if not section.strip():
-            continue
+    try:
+        for section in iter_analysis_sections(chunks):
+            section = clean_html(section)
+            sections.append(section)
+            if not section.strip():
+                continue
+            if first_section_at is None:
+                first_section_at = time.perf_counter() - start
+            
+            title, content = split_analysis_section(section)
+            if "Match Score" in title:
+                if not score_shown:
+                    with score_placeholder.container():
+                        create_placement_indicator(extract_match_score(section))
+                    score_shown = True
+                continue
             
-        if '\n' in section:
-            title, content = section.split('\n', 1)
+            render_analysis_card(title, content)
+    except StreamError as e:
+        current_trace().add("groq + render (streamed)", time.perf_counter() - start, error=str(e))
+        return analysis_result.error_result(str(e))
+    
+    result = apply_keywords(analysis_result.from_markdown_sections(sections), keywords, route)
+    if not score_shown:
+        with score_placeholder.container():
+            create_placement_indicator(result.score)
+    
+    total = time.perf_counter() - start
+    # Groq and rendering interleave while streaming, so they share one span
+    current_trace().add("groq + render (streamed)", total, first_section_seconds=first_section_at)
+    st.caption(f"First section after {first_section_at or total:.1f}s, complete after {total:.1f}s")
+    return result
+
+def show_analysis_usage(info):
+    """Show token usage of an analysis and whether it came from the cache."""
+    if not info:
+        return
+    total_tokens = info["usage"].get("total_tokens")
+    if info["cached"]:
+        st.caption(f"Served from cache - no API quota used (original run: {total_tokens or 'unknown'} tokens)")
+    elif total_tokens:
+        st.caption(f"Tokens used: {total_tokens}")
+
+def show_trace_panel():
+    """Show the span breakdown of the latest analysis in this session."""
+    trace = st.session_state.get("last_trace")
+    if not trace:
+        return
+    with st.expander("🔍 Timing breakdown (debug)", expanded=True):
+        st.caption(f"Trace {trace['trace_id']}: {trace['seconds']:.2f}s total")
+        st.dataframe(
+            [
+                {
+                    "Stage": span["name"],
+                    "Start (ms)": round(span["start"] * 1000),
+                    "Duration (ms)": round(span["seconds"] * 1000),
+                    "Details": ", ".join(f"{key}={value}" for key, value in span["attrs"].items()),
+                }
+                for span in trace["spans"]
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(", ".join(f"{key}: {value}" for key, value in trace["attrs"].items()))
+        flights = (singleflight.ANALYSES, singleflight.COMPANIES)
+        st.caption(
+            "Shared in-flight calls (process-wide): " + "; ".join(
+                f"{flight.name} {stats['coalesced']} coalesced into {stats['calls']} calls"
+                for flight, stats in ((flight, flight.stats()) for flight in flights)
+            )
+        )
+
+# Analyses kept per session, so reruns redraw results instead of recomputing them
+MAX_STORED_RESULTS = 5
+
+def input_key(*parts):
+    """Hash analysis inputs (uploaded bytes, texts and options) into a results key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, bytes):
+            part = repr(part).encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+@st.cache_resource
+def get_artifact_store():
+    """Create the store holding every session's results under one memory budget."""
+    return session_store.store_from_env()
+
+def session_id():
+    """Identify this browser session in the artifact store."""
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+def keep_artifact(kind, key, value):
+    """Store a session artifact, keeping at most MAX_STORED_RESULTS of each kind per session.
+
+    Session state only holds the keys; the store may still evict the
+    artifact itself to stay within its memory budget.
+    """
+    keys = st.session_state.setdefault(f"{kind}_keys", [])
+    if key in keys:
+        keys.remove(key)
+    keys.append(key)
+    store = get_artifact_store()
+    while len(keys) > MAX_STORED_RESULTS:
+        store.discard(session_id(), (kind, keys.pop(0)))
+    store.put(session_id(), (kind, key), value)
+
+def remember_resume_version(key, resume_text, result):
+    """Keep the latest analyzed resume per job, so the next edit can be re-analyzed incrementally."""
+    if result.error or result.score is None:
+        return
+    keep_artifact("resume_version", key, (resume_text, result))
+
+def resume_version(key):
+    """Return the ``(resume_text, result)`` last analyzed for ``key``, or None."""
+    return get_artifact_store().get(session_id(), ("resume_version", key))
+
+def store_results(key, view):
+    """Keep an analysis view so reruns redraw it without recomputing."""
+    keep_artifact("view", key, view)
+    st.session_state["current_results"] = key
+
+def stored_results(key=None):
+    """Return the stored view for ``key`` (default: the latest analysis), or None if absent or evicted."""
+    key = key or st.session_state.get("current_results")
+    return get_artifact_store().get(session_id(), ("view", key)) if key else None
+
+def show_results(view, show_quick_score=True):
+    """Draw a stored analysis view."""
+    if view["kind"] == "job":
+        show_job(view, show_quick_score)
+        return
+    if view["kind"] == "batch":
+        show_batch_results(view)
+        return
+    if show_quick_score:
+        create_quick_score_indicator(view["quick_score"])
+    for note in view.get("notes", ()):
+        st.warning(note)
+    if view.get("reuse_note"):
+        st.caption(view["reuse_note"])
+    if view["result"] is None:
+        st.warning(
+            f"Quick match is below {view['min_quick_score']}%, so the AI analysis was skipped. "
+            "Lower the threshold in Options to analyze anyway."
+        )
+        return
+    st.success("Analysis complete!")
+    with st.expander("View Analysis Results", expanded=True), current_trace().span("render"):
+        format_analysis_content(view["result"])
+        show_analysis_usage(view["usage"])
+
+# Seconds between status checks while waiting for a background job
+JOB_POLL_SECONDS = 1
+
+def submit_job(kind, view, payload):
+    """Queue an analysis as a background job; returns the job view to store, or None if the queue is full."""
+    with current_trace().span("submit job", kind=kind) as span:
+        try:
+            job_id = get_job_queue().submit(kind, dict(payload, view=view))
+        except job_queue.QueueFull as e:
+            st.error(str(e))
+            return None
+        span["job_id"] = job_id
+    # Keep the id in the URL so a refresh reopens the job
+    st.query_params["job"] = job_id
+    return {"kind": "job", "job_id": job_id}
+
+def job_view(job):
+    """Build the results view of a finished job from its stored inputs and result."""
+    view = dict(job.payload["view"], job_id=job.id)
+    notes = job.result["notes"]
+    if job.kind == "single":
+        view["result"] = analysis_result.from_json(job.result["result"])
+        view["usage"] = job.result["usage"]
+        view["notes"] = notes
+        return view
+    results = [
+        dict(
+            result,
+            analysis=analysis_result.error_result(result["error"]) if result["error"]
+            else analysis_result.from_json(result["analysis"])
+        )
+        for result in job.result["results"]
+    ]
+    view["notes"] = view["notes"] + notes
+    view["results"] = results
+    view["summary"] = batch_summary(results, job.result["seconds"])
+    return view
+
+def show_job(view, show_quick_score=True):
+    """Wait for a background job, then draw its results and store them in place of the job view."""
+    if not background_available():
+        st.error("Background jobs need GROQ_API_KEY to be set in the environment")
+        return
+    queue = get_job_queue()
+    status = st.empty()
+    while True:
+        job = queue.get(view["job_id"])
+        if job is None:
+            status.error(f"No background job with id {view['job_id']}")
+            return
+        if job.status in ("done", "failed"):
+            break
+        if job.status == "queued":
+            status.info(
+                f"⏳ Job {job.id} is queued ({queue.position(job.id)} ahead). "
+                "It keeps going if you refresh or leave; reopen it by id from the sidebar."
+            )
         else:
-            title = section
-            content = ""
+            status.info(
+                f"⚙️ Job {job.id} has been running for {time.time() - job.started_at:.0f}s. "
+                "It keeps going if you refresh or leave; reopen it by id from the sidebar."
+            )
+        time.sleep(JOB_POLL_SECONDS)
+    status.empty()
+    
+    if job.status == "failed":
+        st.error(f"Job {job.id} failed: {job.error}")
+        return
+    view.clear()
+    view.update(job_view(job))
+    # The job view is the current one; account for the results it now holds
+    get_artifact_store().resize(session_id(), ("view", st.session_state.get("current_results")))
+    st.caption(f"Background job {job.id}")
+    show_results(view, show_quick_score)
+
+def run_single_analysis(resume_file, jd_file, jd_text, company_url, use_cache, stream, min_quick_score,
+                        route=None, hedge=False, background=False, map_reduce=False):
+    """Analyze the resume against one job and show the result.
+
+    ``route`` (see routing.choose_route) picks the model and sections; ``hedge``
+    applies to non-streamed requests only. With ``background`` the analysis is
+    queued as a job; with ``map_reduce`` documents too long for one prompt are
+    analyzed in parts. After an edit to a resume already analyzed against the
+    same job, only the changed sections are re-analyzed. Returns the view to
+    store, or None if the inputs could not be analyzed.
+    """
+    with st.spinner("Analyzing your resume..."):
+        # Extract text from files
+        resume_text = extract_text_from_pdf(resume_file)
+        if not resume_text:
+            return None
         
-        # Skip the Match Score section since we display it separately
-        if "Match Score" in title:
-            continue
-            
-        # Different card styles for different sections
-        if "Recommendations" in title:
-            icon = "💡"
-            border_color = "#6C63FF"
-        elif "Missing" in title:
-            icon = "🔎"
-            border_color = "#4CAF50"
-        elif "Overused" in title:
-            icon = "🔄"
-            border_color = "#FF9800"
-        elif "Gap" in title:
-            icon = "📉"
-            border_color = "#2196F3"
-        elif "Improvements" in title:
-            icon = "🛠️"
-            border_color = "#9C27B0"
-        elif "Action" in title:
-            icon = "✅"
-            border_color = "#00BCD4"
+        if jd_file is not None:
+            jd_text = extract_text_from_pdf(jd_file)
+            if not jd_text:
+                return None
+        
+        # Instant local score, also used to gate the LLM call
+        with current_trace().span("quick score"):
+            quick_score = get_local_scorer().score(resume_text, jd_text)
+        view = {
+            "kind": "single",
+            "quick_score": quick_score,
+            "min_quick_score": min_quick_score,
+            "result": None,
+            "usage": None,
+        }
+        create_quick_score_indicator(quick_score)
+        if quick_score < min_quick_score:
+            show_results(view, show_quick_score=False)
+            return view
+        
+        if background:
+            return submit_job("single", view, {
+                "jd_text": jd_text, "resume_text": resume_text, "company_url": company_url,
+                "use_cache": use_cache, "route": route._asdict(), "hedge": hedge, "map_reduce": map_reduce,
+            })
+        
+        st.session_state.pop("last_analysis_usage", None)
+        keywords = scan_keywords(resume_text, jd_text, route)
+        version_key = input_key(jd_text, company_url, route)
+        # Refreshing without the cache re-analyzes the whole resume
+        previous = resume_version(version_key) if use_cache else None
+        reused = None
+        if previous:
+            reused = reanalyze_with_groq(
+                previous, resume_text, jd_text, use_cache=use_cache, route=route, hedge=hedge, keywords=keywords
+            )
+        
+        if reused is None:
+            # Get company info if URL provided
+            company_info = None
+            if company_url:
+                company_info = get_company_info(company_url)
+            if use_cache:
+                reused = reuse_similar_analysis(jd_text, resume_text, company_info, route, keywords)
+        
+        if reused is not None:
+            result, view["reuse_note"] = reused
         else:
-            icon = "📌"
-            border_color = "#607D8B"
+            if stream:
+                # Render each section as soon as the model finishes it
+                with st.expander("View Analysis Results", expanded=True):
+                    view["result"] = render_streamed_analysis(
+                        stream_analysis_with_groq(
+                            jd_text, resume_text, company_info, use_cache=use_cache, route=route, keywords=keywords,
+                            map_reduce=map_reduce
+                        ),
+                        keywords,
+                        route,
+                    )
+                    view["usage"] = st.session_state.pop("last_analysis_usage", None)
+                    show_analysis_usage(view["usage"])
+                if view["result"].error:
+                    st.error(view["result"].error)
+                    return None
+                if view["usage"] and not view["usage"]["cached"]:
+                    remember_analysis(
+                        resume_text, jd_text, view["result"], view["usage"]["usage"], company_info, route, keywords
+                    )
+                st.success("Analysis complete!")
+                remember_resume_version(version_key, resume_text, view["result"])
+                return view
+            
+            # Perform analysis
+            result = analyze_resume_with_groq(
+                jd_text, resume_text, company_info, use_cache=use_cache, route=route, hedge=hedge, keywords=keywords,
+                map_reduce=map_reduce
+            )
+        if result.error:
+            st.error(result.error)
+            return None
+        view["result"] = result
+        view["usage"] = st.session_state.pop("last_analysis_usage", None)
+        remember_resume_version(version_key, resume_text, result)
+    
+    show_results(view, show_quick_score=False)
+    return view
+
+def run_batch_analysis(resume_file, jd_files, jd_blocks, company_url, use_cache, max_concurrency,
+                       min_quick_score=0, library_top_k=0, route=None, hedge=False, background=False, map_reduce=False):
+    """Analyze the resume against every supplied job and show a ranked table.
+
+    With ``library_top_k``, the best-matching JDs from the library are added
+    to the jobs. With ``background`` the analyses are queued as one job.
+    Returns the view to store, or None if nothing could be analyzed.
+    """
+    jobs = []
+    notes = []
+    with st.spinner("Reading documents..."):
+        resume_text = extract_text_from_pdf(resume_file)
+        if not resume_text:
+            return None
         
-        st.markdown(
-            f"""
-            <div class="card" style="border-left: 4px solid {border_color};">
-                <div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;">
-                    <span style="font-size: 24px;">{icon}</span>
-                    <h3 style="margin: 0;">{title}</h3>
-                </div>
-                <div style="color: var(--text-color);">
-                    {content.replace('\n', '<br>')}
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True
+        if library_top_k:
+            library = get_jd_index()
+            with current_trace().span("library search", k=library_top_k) as span:
+                start = time.perf_counter()
+                matches = library.search(resume_text, k=library_top_k)
+                span["library_size"] = len(library)
+            notes.append(
+                f"Picked the top {len(matches)} of {span['library_size']} library jobs "
+                f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            jobs.extend((match["name"], match["text"]) for match in matches)
+        
+        for jd_file in jd_files or []:
+            jd_text = extract_text_from_pdf(jd_file)
+            if jd_text:
+                jobs.append((jd_file.name, jd_text))
+        for i, block in enumerate(split_pasted_jobs(jd_blocks or ""), start=1):
+            jobs.append((f"Pasted job {i}: {block.splitlines()[0][:60]}", block))
+        
+        if not jobs:
+            st.error("Please upload or paste at least one job description")
+            return None
+        
+        # Screen locally first so only promising jobs pay for an LLM call
+        with current_trace().span("quick score", jobs=len(jobs)):
+            scorer = get_local_scorer()
+            similarities = scorer.similarities(resume_text, [jd_text for _, jd_text in jobs])
+        # Kept by position: uploads can share a file name
+        scored = [(job, scorer.to_percent(similarity)) for job, similarity in zip(jobs, similarities)]
+        screened_out = [name for (name, _), score in scored if score < min_quick_score]
+        jobs = [job for job, score in scored if score >= min_quick_score]
+        quick_scores = [score for _, score in scored if score >= min_quick_score]
+        view = {
+            "kind": "batch",
+            "notes": notes,
+            "screened_out": screened_out,
+            "min_quick_score": min_quick_score,
+            "quick_scores": quick_scores,
+            "summary": None,
+            "results": [],
+        }
+        if not jobs:
+            show_batch_results(view)
+            return view
+        
+        if background:
+            return submit_job("batch", view, {
+                "resume_text": resume_text, "jobs": jobs, "company_url": company_url, "use_cache": use_cache,
+                "max_workers": max_concurrency, "route": route._asdict(), "hedge": hedge, "map_reduce": map_reduce,
+            })
+        
+        company_info = get_company_info(company_url) if company_url else None
+    
+    with st.spinner(f"Analyzing {len(jobs)} jobs ({max_concurrency} at a time)..."):
+        start = time.perf_counter()
+        with current_trace().span("groq (batch)", jobs=len(jobs), concurrency=max_concurrency) as span:
+            results = analyze_jobs_concurrently(
+                resume_text, jobs, groq_client(), get_response_cache(), company_info,
+                use_cache=use_cache, max_workers=max_concurrency, route=route, hedge=hedge, map_reduce=map_reduce
+            )
+            span["cached"] = sum(result["cached"] for result in results)
+        elapsed = time.perf_counter() - start
+    
+    view["summary"] = batch_summary(results, elapsed)
+    view["results"] = results
+    show_batch_results(view)
+    return view
+
+def batch_summary(results, elapsed):
+    slowest = max(result["seconds"] for result in results)
+    return (
+        f"Analyzed {len(results)} jobs in {elapsed:.1f}s "
+        f"(slowest single call {slowest:.1f}s, sum of calls {sum(r['seconds'] for r in results):.1f}s)"
+    )
+
+def show_batch_results(view):
+    """Draw the ranked table and per-job cards of a batch analysis."""
+    for note in view["notes"]:
+        st.caption(note)
+    if view["screened_out"]:
+        st.info(
+            f"{len(view['screened_out'])} job(s) scored below {view['min_quick_score']}% locally and were not sent "
+            "for AI analysis: " + ", ".join(view["screened_out"])
         )
+    if not view["results"]:
+        return
+    
+    st.success(view["summary"])
+    st.dataframe(
+        [
+            {
+                "Rank": rank,
+                "Job": result["name"],
+                "Match Score (%)": result["score"],
+                "Quick Score (%)": view["quick_scores"][result["index"]],
+                "Seconds": round(result["seconds"], 1),
+                "Cached": result["cached"],
+            }
+            for rank, result in enumerate(view["results"], start=1)
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    with current_trace().span("render"):
+        for rank, result in enumerate(view["results"], start=1):
+            score_label = "no score" if result["score"] is None else f"{result['score']}%"
+            with st.expander(f"#{rank} {result['name']} - {score_label}"):
+                if result["analysis"].error:
+                    st.error(result["analysis"].error)
+                    continue
+                format_analysis_content(result["analysis"])
 
 def main():
     # Header section
@@ -581,6 +988,7 @@ def main():
         <p>Optimize your resume for your dream job with AI-powered insights</p>
     </div>
     """, unsafe_allow_html=True)
+    record_startup_timing("first paint", time.perf_counter() - SCRIPT_STARTED)
 
     # Sidebar
     with st.sidebar:
@@ -604,104 +1012,252 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
-    # Main content area
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        # Resume upload section
-        st.markdown("""
-        <div class="card fade-in">
-            <h2>📄 Upload Your Resume</h2>
-        </div>
-        """, unsafe_allow_html=True)
+        pdf_stats = get_pdf_cache().stats()
+        st.caption(
+            f"PDF cache: {pdf_stats['hits']} hits / {pdf_stats['misses']} misses "
+            f"({pdf_stats['hit_rate']:.0%} hit rate)"
+        )
+        llm_stats = get_response_cache().stats()
+        st.caption(
+            f"Analysis cache: {llm_stats['hits']} hits / {llm_stats['misses']} misses, "
+            f"{llm_stats['entries']} stored"
+        )
+        if neardup.shared() is not None:
+            near_stats = neardup.shared().stats()
+            st.caption(
+                f"Near-duplicate reuse: {near_stats['hits']} hits / {near_stats['misses']} misses "
+                f"({near_stats['rejected']} rejected by the delta check), {near_stats['entries']} stored"
+            )
+        company_stats = company_profiles().stats()
+        st.caption(
+            f"Company profiles: {company_stats['profiles']} stored, {company_stats['fresh']} fresh / "
+            f"{company_stats['stale']} stale / {company_stats['misses']} scraped, "
+            f"{company_stats['cached_errors']} failing sites skipped"
+        )
         
-<<<<<<< HEAD
-        resume_file = st.file_uploader("Choose your resume (PDF)", type="pdf", key="resume")
-
-        # Job description section
-        st.markdown("""
-        <div class="card fade-in">
-            <h2>🎯 Job Description</h2>
-        </div>
-        """, unsafe_allow_html=True)
+        reopen_job = ""
+        if background_available():
+            with st.expander("🗂️ Background jobs"):
+                job_stats = get_job_queue().stats()
+                st.caption(
+                    f"{job_stats['queued']} queued / {job_stats['running']} running on {job_stats['workers']} "
+                    f"workers (max {job_stats['max_queued']} queued); {job_stats['done']} done, "
+                    f"{job_stats['failed']} failed"
+                )
+                reopen_job = st.text_input("Reopen a job by id").strip()
         
-        jd_option = st.radio("Choose input method:", ["Upload PDF", "Paste Text"])
+        with st.expander("🧠 Memory"):
+            report = session_store.memory_report(get_artifact_store(), pdf_stats)
+            for name, value in report.items():
+                if value is None:
+                    continue
+                label = name.replace("_", " ").capitalize()
+                st.caption(f"{label}: {value / 1e6:.2f} MB" if name.endswith("bytes") else f"{label}: {value}")
         
-        if jd_option == "Upload PDF":
-            jd_file = st.file_uploader("Upload job description (PDF)", type="pdf", key="jd")
-        else:
-            jd_text = st.text_area("Paste job description here", height=200)
+        with st.expander("⏱️ Startup timing"):
+            timings = {**get_startup_report(), **st.session_state.get("run_timings", {})}
+            for name, seconds in sorted(timings.items()):
+                st.caption(f"{name}: {seconds * 1000:.0f} ms")
 
-    with col2:
-        # Additional options
-        st.markdown("""
-        <div class="card fade-in">
-            <h2>⚙️ Options</h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-=======
->>>>>>> 991489f1c2ad9699376335c6dc034b7a5e8386a9
-        analysis_depth = st.select_slider(
-            "Analysis Depth",
-            options=["Basic", "Standard", "Detailed"],
-            value="Standard"
+    # Mode switches stay outside the form because they change which inputs are shown
+    mode_col, method_col = st.columns([2, 1])
+    with mode_col:
+        analysis_mode = st.radio(
+            "Compare against:", ["One job", "Many jobs (batch)", "Job library (top matches)"], horizontal=True
         )
-        
-        include_keywords = st.checkbox("Include keyword analysis", value=True)
-        include_skills = st.checkbox("Include skills gap analysis", value=True)
-        include_formatting = st.checkbox("Include formatting suggestions", value=True)
+    library_mode = analysis_mode == "Job library (top matches)"
+    batch_mode = analysis_mode == "Many jobs (batch)" or library_mode
+    if not batch_mode:
+        with method_col:
+            jd_option = st.radio("Choose input method:", ["Upload PDF", "Paste Text"], horizontal=True)
+    
+    if library_mode:
+        with st.expander("📚 Job library", expanded=not len(get_jd_index())):
+            library_files = st.file_uploader(
+                "Add job descriptions to the library (PDF)", type="pdf", key="jd_library",
+                accept_multiple_files=True
+            )
+            if library_files and st.button("📚 Add to library"):
+                with st.spinner("Indexing job descriptions..."):
+                    added, replaced = add_to_library(library_files)
+                st.success(f"Indexed {added} new or changed job description(s)")
+                if replaced:
+                    st.info(
+                        "Replaced the library entries with the same file name: " + ", ".join(replaced)
+                        + ". Rename a file to keep both versions."
+                    )
+            entries = get_jd_index().entries()
+            if entries:
+                names = {entry["key"]: entry["name"] for entry in entries}
+                to_remove = st.multiselect(
+                    "Remove job descriptions", list(names), format_func=names.get, key="library_remove"
+                )
+                if to_remove:
+                    st.button("🗑️ Remove from library", on_click=remove_from_library)
+            st.caption(f"Library: {len(get_jd_index())} job descriptions")
 
-        # Company website input
-        st.markdown("""
-        <div class="card fade-in">
-            <h2>🏢 Company Info (Optional)</h2>
-        </div>
-        """, unsafe_allow_html=True)
-        company_url = st.text_input("Company website URL (for better customization)")
+    # Inputs are only sent to the server when the form is submitted
+    with st.form("analysis_inputs", border=False):
+        col1, col2 = st.columns([2, 1])
 
-    # Analysis button
-    if st.button("🚀 Analyze Resume", use_container_width=True):
-        if not resume_file:
-            st.error("Please upload your resume first")
-            return
+        with col1:
+            # Resume upload section
+            st.markdown("""
+            <div class="card fade-in">
+                <h2>📄 Upload Your Resume</h2>
+            </div>
+            """, unsafe_allow_html=True)
             
+            resume_file = st.file_uploader("Choose your resume (PDF)", type="pdf", key="resume")
+
+            # Job description section
+            st.markdown("""
+            <div class="card fade-in">
+                <h2>🎯 Job Description</h2>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            jd_file = None
+            jd_text = ""
+            jd_files = None
+            jd_blocks = ""
+            if library_mode:
+                st.caption("The best matches from the job library are analyzed.")
+            elif batch_mode:
+                jd_files = st.file_uploader(
+                    "Upload job descriptions (PDF)", type="pdf", key="jd_batch", accept_multiple_files=True
+                )
+                jd_blocks = st.text_area(
+                    "Or paste job descriptions, separated by a line containing only ---", height=200
+                )
+            elif jd_option == "Upload PDF":
+                jd_file = st.file_uploader("Upload job description (PDF)", type="pdf", key="jd")
+            else:
+                jd_text = st.text_area("Paste job description here", height=200)
+
+        with col2:
+            # Additional options
+            st.markdown("""
+            <div class="card fade-in">
+                <h2>⚙️ Options</h2>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            analysis_depth = st.select_slider(
+                "Analysis Depth",
+                options=["Basic", "Standard", "Detailed"],
+                value="Standard"
+            )
+            
+            include_keywords = st.checkbox("Include keyword analysis", value=True)
+            include_skills = st.checkbox("Include skills gap analysis", value=True)
+            include_formatting = st.checkbox("Include formatting suggestions", value=True)
+            hedge_requests = st.checkbox(
+                "Hedge slow requests", value=False,
+                help="Send a backup request when a call runs slower than usual; "
+                     "lowers tail latency at the cost of a few extra calls (not used while streaming)"
+            )
+            stream_results = st.checkbox("Show results as they arrive", value=True)
+            map_reduce = st.checkbox(
+                "Analyze long documents in parts", value=True,
+                help="Documents too long for one prompt are reviewed in parallel parts and merged, "
+                     "instead of analyzing only their most relevant sections"
+            )
+            run_in_background = st.checkbox(
+                "Run in background", value=False, disabled=not background_available(),
+                help="Queue the analysis as a job that survives a page refresh and can be reopened by id "
+                     "(results are shown when it finishes; needs GROQ_API_KEY in the environment)"
+            )
+            use_cached_results = st.checkbox(
+                "Reuse cached results", value=True,
+                help="Uncheck to force a fresh analysis even if this exact request was analyzed before"
+            )
+            min_quick_score = st.slider(
+                "Minimum quick score for AI analysis", min_value=0, max_value=100, value=0, step=5,
+                help="Resumes scoring below this on the instant local check skip the AI analysis"
+            )
+            max_concurrency = 1
+            library_top_k = 0
+            if batch_mode:
+                max_concurrency = st.slider("Parallel requests (batch)", min_value=1, max_value=16, value=4)
+            if library_mode:
+                library_top_k = st.slider("Library matches to analyze", min_value=1, max_value=20, value=5)
+            st.checkbox("Show timing breakdown (debug)", value=False, key="show_timing_debug")
+
+            # Company website input
+            st.markdown("""
+            <div class="card fade-in">
+                <h2>🏢 Company Info (Optional)</h2>
+            </div>
+            """, unsafe_allow_html=True)
+            company_url = st.text_input("Company website URL (for better customization)")
+
+        # Analysis button
+        submitted = st.form_submit_button("🚀 Analyze Resume", use_container_width=True)
+
+    if not submitted:
+        # Widget changes outside a submit only redraw the stored results
+        view = stored_results()
+        job_id = reopen_job or st.query_params.get("job")
+        if job_id and (not view or view.get("job_id") != job_id):
+            st.query_params["job"] = job_id
+            view = {"kind": "job", "job_id": job_id}
+            store_results(f"job:{job_id}", view)
+        if view:
+            show_results(view)
+        return
+    
+    st.query_params.pop("job", None)
+    route = routing.choose_route(analysis_depth, include_keywords, include_skills, include_formatting)
+    start_trace("library" if library_mode else "batch" if batch_mode else "single")
+    current_trace().attrs.update(depth=route.depth, model=route.model)
+    if not resume_file:
+        st.error("Please upload your resume first")
+        return
+    
+    if library_mode and not len(get_jd_index()):
+        st.error("The job library is empty - add job descriptions first")
+        return
+    
+    if not batch_mode:
         if jd_option == "Upload PDF" and not jd_file:
             st.error("Please upload or paste the job description")
             return
         elif jd_option == "Paste Text" and not jd_text:
             st.error("Please paste the job description")
             return
-            
-        with st.spinner("Analyzing your resume..."):
-            # Extract text from files
-            resume_text = extract_text_from_pdf(resume_file)
-            if not resume_text:
-                return
-                
-            if jd_option == "Upload PDF":
-                jd_text = extract_text_from_pdf(jd_file)
-                if not jd_text:
-                    return
-            
-            # Get company info if URL provided
-            company_info = None
-            if company_url:
-                company_info = get_company_info(company_url)
-            
-            # Perform analysis
-            analysis_text = analyze_resume_with_groq(jd_text, resume_text, company_info)
-            
-            # Display results
-            st.success("Analysis complete!")
-            
-            with st.expander("View Analysis Results", expanded=True):
-                # Extract and display match score
-                match_score = extract_match_score(analysis_text)
-                create_placement_indicator(match_score)
-                
-                # Display the rest of the analysis
-                format_analysis_content(analysis_text)
+    
+    key = input_key(
+        analysis_mode, resume_file.getvalue(), jd_file.getvalue() if jd_file else jd_text,
+        [jd.getvalue() for jd in jd_files or []], jd_blocks, company_url,
+        analysis_depth, include_keywords, include_skills, include_formatting, map_reduce,
+        min_quick_score, library_top_k, len(get_jd_index()) if library_mode else 0
+    )
+    view = stored_results(key) if use_cached_results else None
+    if view:
+        st.session_state["current_results"] = key
+        show_results(view)
+        return
+    
+    if batch_mode:
+        view = run_batch_analysis(
+            resume_file, jd_files, jd_blocks, company_url, use_cached_results, max_concurrency, min_quick_score,
+            library_top_k=library_top_k, route=route, hedge=hedge_requests, background=run_in_background,
+            map_reduce=map_reduce
+        )
+    else:
+        view = run_single_analysis(
+            resume_file, jd_file, jd_text, company_url, use_cached_results, stream_results, min_quick_score,
+            route=route, hedge=hedge_requests, background=run_in_background, map_reduce=map_reduce
+        )
+    if view:
+        store_results(key, view)
+        if view["kind"] == "job":
+            show_results(view, show_quick_score=False)
 
 if __name__ == "__main__":
     main()
+    finish_trace()
+    if st.session_state.get("show_timing_debug"):
+        show_trace_panel()
+    record_startup_timing("script run", time.perf_counter() - SCRIPT_STARTED)
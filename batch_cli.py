@@ -0,0 +1,288 @@
+"""Headless bulk analysis of resume/JD pairs.
+
+    python batch_cli.py --resumes resumes/ --jobs jobs/ --output results.jsonl
+
+Every resume is analyzed against every job. Results are appended to the
+output JSONL as they complete. Re-running with the same output file skips
+pairs that already finished, so an interrupted run resumes where it stopped.
+
+``--jobs`` accepts PDF/text files, directories of them, and JSONL manifests
+with one ``{"id": ..., "path" or "text": ..., "company_url": ...}`` object
+per line.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+import analysis
+import analysis_result
+import llm_cache
+import pdf_cache
+import routing
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def load_jobs(paths, default_company_url=None):
+    """Return job dicts with ``id``, ``path`` or ``text``, and ``company_url``."""
+    jobs = []
+    for path in paths:
+        if path.lower().endswith(".jsonl"):
+            base_dir = os.path.dirname(os.path.abspath(path))
+            with open(path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    job = {
+                        "id": entry.get("id") or f"{os.path.basename(path)}:{line_number}",
+                        "company_url": entry.get("company_url") or default_company_url,
+                    }
+                    if "text" in entry:
+                        job["text"] = entry["text"]
+                    else:
+                        job["path"] = os.path.join(base_dir, entry["path"])
+                    jobs.append(job)
+        else:
+            jobs.extend(
+                {"id": file_path, "path": file_path, "company_url": default_company_url}
+                for file_path in analysis.discover_files([path])
+            )
+    return jobs
+
+
+def extract_documents(paths, text_cache, workers):
+    """Return ``{path: text}``, extracting cache misses in a process pool.
+
+    Documents that cannot be read are logged and left out, so their pairs are skipped.
+    """
+    texts = {}
+    misses = {}
+    namespace = analysis.pdf_text_namespace()
+    for path in paths:
+        try:
+            if not path.lower().endswith(".pdf"):
+                texts[path] = analysis.read_document(path)
+                continue
+            with open(path, "rb") as f:
+                key = text_cache.key_for(f.read(), namespace)
+        except (OSError, UnicodeDecodeError) as e:
+            log(f"Skipping unreadable document {path}: {e}")
+            continue
+        cached = text_cache.get(key)
+        if cached is None:
+            misses[path] = key
+        else:
+            texts[path] = cached
+
+    if misses:
+        log(f"Extracting {len(misses)} PDFs ({len(texts)} served from cache)")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analysis.read_document, path): path for path in misses}
+            for future in futures:
+                path = futures[future]
+                try:
+                    texts[path] = future.result()
+                except Exception as e:
+                    log(f"Skipping unreadable document {path}: {e}")
+                    continue
+                text_cache.put(misses[path], texts[path])
+    return texts
+
+
+def pair_id(resume_text, jd_text, company_url):
+    """Identify a pair by content, so edited documents are analyzed again."""
+    digest = hashlib.sha256()
+    for part in (resume_text, jd_text, company_url or ""):
+        digest.update(hashlib.sha256(part.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def end_with_newline(output_path):
+    """Terminate a torn last line left by a crash, so the next record starts on a line of its own."""
+    if not os.path.exists(output_path) or not os.path.getsize(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def completed_pairs(output_path):
+    """Return ids of pairs that already have a final result in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A torn last line from an interrupted run
+            if record.get("status") in ("ok", "screened_out"):
+                done.add(record["pair_id"])
+    return done
+
+
+def fetch_companies(urls, workers):
+    """Scrape each distinct company URL once; failures map to None."""
+    companies = {}
+    if not urls:
+        return companies
+
+    def fetch(url):
+        try:
+            return analysis.fetch_company_info(url)
+        except Exception as e:
+            log(f"Could not scrape {url}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url, info in zip(urls, executor.map(fetch, urls)):
+            companies[url] = info
+    return companies
+
+
+def run(args):
+    load_dotenv()
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise SystemExit("GROQ_API_KEY is not set")
+
+    resume_paths = analysis.discover_files(args.resumes)
+    jobs = load_jobs(args.jobs, args.company_url)
+    if not resume_paths or not jobs:
+        raise SystemExit("No resumes or job descriptions found")
+
+    text_cache = pdf_cache.cache_from_env()
+    job_paths = sorted({job["path"] for job in jobs if "path" in job})
+    texts = extract_documents(resume_paths + job_paths, text_cache, args.extract_workers)
+    for job in jobs:
+        if "text" not in job:
+            job["text"] = texts.get(job["path"])
+    jobs = [job for job in jobs if job["text"]]
+    resumes = [(path, texts[path]) for path in resume_paths if texts.get(path)]
+
+    if args.restart:
+        # Start a fresh output file; appending would list pairs twice
+        open(args.output, "w", encoding="utf-8").close()
+    else:
+        end_with_newline(args.output)
+    done = completed_pairs(args.output)
+    pending = []
+    for resume_path, resume_text in resumes:
+        for job in jobs:
+            pid = pair_id(resume_text, job["text"], job["company_url"])
+            if pid not in done:
+                pending.append((pid, resume_path, resume_text, job))
+    total = len(resumes) * len(jobs)
+    log(f"{total} pairs, {total - len(pending)} already done, {len(pending)} to run")
+    if not pending:
+        return
+
+    companies = fetch_companies(sorted({job["company_url"] for _, _, _, job in pending if job["company_url"]}),
+                                args.workers)
+    client = analysis.create_groq_client(api_key)
+    cache = llm_cache.cache_from_env()
+    route = routing.choose_route(args.depth)
+    scorer = None
+    if args.min_quick_score:
+        import local_score
+        scorer = local_score.load_scorer()
+
+    def analyze(pid, resume_path, resume_text, job):
+        record = {
+            "pair_id": pid,
+            "resume": resume_path,
+            "job": job["id"],
+            "company_url": job["company_url"],
+        }
+        start = time.perf_counter()
+        if scorer is not None:
+            record["quick_score"] = scorer.score(resume_text, job["text"])
+            if record["quick_score"] < args.min_quick_score:
+                record["status"] = "screened_out"
+                return record
+        company_info = companies.get(job["company_url"])
+        result, usage, cached = analysis.analyze_pair(
+            job["text"], resume_text, client, cache, company_info, use_cache=not args.no_cache, route=route,
+            hedge=args.hedge, map_reduce=args.map_reduce
+        )
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        if result.error:
+            record.update(status="error", error=result.error)
+            return record
+        record.update(
+            status="ok",
+            score=result.score,
+            cached=cached,
+            model=route.model,
+            usage=usage,
+            analysis=analysis_result.to_dict(result),
+        )
+        return record
+
+    finished = 0
+    failed = 0
+    started = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=args.workers) as executor:
+        queue = iter(pending)
+        in_flight = set()
+        while True:
+            # Keep a bounded number of pairs in flight instead of queueing thousands
+            while len(in_flight) < args.workers * 2:
+                item = next(queue, None)
+                if item is None:
+                    break
+                in_flight.add(executor.submit(analyze, *item))
+            if not in_flight:
+                break
+            completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                finished += 1
+                failed += record["status"] == "error"
+                log(
+                    f"[{finished}/{len(pending)}] {record['resume']} x {record['job']}: "
+                    f"{record['status']} {record.get('score', '')}"
+                )
+
+    elapsed = time.perf_counter() - started
+    log(f"Finished {finished} pairs in {elapsed:.1f}s ({failed} errors; re-run to retry them)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze resumes against job descriptions without the UI.")
+    parser.add_argument("--resumes", nargs="+", required=True, help="Resume PDFs or directories of them")
+    parser.add_argument("--jobs", nargs="+", required=True, help="JD files, directories or JSONL manifests")
+    parser.add_argument("--output", required=True, help="JSONL file to append results to (also the checkpoint)")
+    parser.add_argument("--company-url", help="Company website used for jobs without their own company_url")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent analysis requests (default 4)")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used for PDF extraction (default: CPU count)")
+    parser.add_argument("--min-quick-score", type=int, default=0,
+                        help="Skip the LLM for pairs below this local match score")
+    parser.add_argument("--depth", choices=list(routing.DEPTHS), default="Detailed",
+                        help="Analysis depth; picks the model and sections (default Detailed)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a backup request when a call runs slower than usual")
+    parser.add_argument("--map-reduce", action="store_true",
+                        help="Analyze documents too long for one prompt in parallel parts, then merge")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached LLM responses")
+    parser.add_argument("--restart", action="store_true",
+                        help="Discard existing results in the output file and analyze every pair again")
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""End-to-end latency benchmark with local stand-ins for Groq and company sites.
+
+    python benchmark.py --requests 40 --concurrency 1 4 16 --llm-latency 1.5
+    python benchmark.py --compare benchmark_results/<previous>.json
+
+Synthetic resume/JD PDFs are generated in memory. The Groq
+chat-completions API and a company website are served locally with
+configurable latency, so runs are reproducible and cost no quota. Each
+stage (extract, company_store, analyze, format) is timed per request and
+reported as p50/p95/p99, along with throughput at each concurrency level.
+``scrape`` times a direct scrape of the company site on every request;
+it is not part of ``total``, since the app serves profiles from the
+company store.
+Results are written as JSON under ``benchmark_results/``.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import analysis
+import analysis_result
+import llm_cache
+import session_store
+
+RESULTS_DIR = "benchmark_results"
+
+SKILLS = [
+    "python", "java", "kubernetes", "docker", "aws", "gcp", "terraform", "react", "typescript", "sql",
+    "postgresql", "spark", "airflow", "pandas", "django", "flask", "graphql", "kafka", "redis", "linux",
+    "ci/cd", "microservices", "machine learning", "data pipelines", "rest apis", "leadership", "mentoring",
+]
+VERBS = ["Built", "Led", "Designed", "Migrated", "Optimized", "Shipped", "Automated", "Scaled", "Owned"]
+SECTIONS = [
+    "Match Score", "Company-Specific Recommendations", "Top 3 Missing Keywords", "Top 3 Overused Terms",
+    "Skills Gap Analysis", "Specific Content Improvements", "Suggested Action Items",
+]
+
+
+# --- Synthetic documents ----------------------------------------------------
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages):
+    """Build a minimal PDF with one Helvetica text block per page (``pages`` is a list of line lists)."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = 2 * len(pages) + 2
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 50 760 Td 12 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1")))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+    return bytes(out)
+
+
+def synthetic_resume(rng, pages):
+    doc = []
+    for page in range(pages):
+        lines = ["Jordan Example - Senior Engineer", f"Page {page + 1} of {pages}", "", "Experience"]
+        for _ in range(45):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(SKILLS)} and {rng.choice(SKILLS)} "
+                         f"systems serving {rng.randint(2, 900)}k users")
+        doc.append(lines)
+    return make_pdf(doc)
+
+
+def synthetic_jd(rng, pages):
+    doc = []
+    for page in range(pages):
+        lines = ["Example Corp - Staff Engineer", "", "Requirements"]
+        for _ in range(40):
+            lines.append(f"- {rng.randint(2, 8)}+ years with {rng.choice(SKILLS)}; familiarity with {rng.choice(SKILLS)}")
+        lines += ["", "Example Corp is an equal opportunity employer."]
+        doc.append(lines)
+    return make_pdf(doc)
+
+
+# --- Local stand-in servers -------------------------------------------------
+
+class StandInServer:
+    """Run an HTTP handler on an ephemeral localhost port in a background thread."""
+
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def groq_handler(latency, jitter, tokens_per_second, seed=0):
+    """Handler imitating Groq's OpenAI-compatible chat-completions endpoint.
+
+    Answers and latency jitter depend only on ``seed`` and the prompt, so a run can be repeated exactly.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = body["messages"][-1]["content"]
+            # Not hash(): string hashes change between processes unless PYTHONHASHSEED is set
+            digest = hashlib.sha256(f"{seed}:{prompt}".encode("utf-8")).digest()
+            rng = random.Random(int.from_bytes(digest[:8], "big"))
+            if body.get("response_format", {}).get("type") == "json_object":
+                text = json.dumps({
+                    "match_score": rng.randint(20, 95),
+                    "score_justification": f"Strong {rng.choice(SKILLS)} background.",
+                    **{
+                        key: [f"{rng.choice(VERBS)} {rng.choice(SKILLS)}" for _ in range(6)]
+                        for key, _, _ in analysis_result.SECTIONS
+                    },
+                })
+            else:
+                text = "\n".join(
+                    f"## {title}: {rng.randint(20, 95)}%" if title == "Match Score" else
+                    f"## {title}\n" + "\n".join(f"- {rng.choice(VERBS)} {rng.choice(SKILLS)}" for _ in range(6))
+                    for title in SECTIONS
+                )
+            completion_tokens = len(text) // 4
+            usage = {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": completion_tokens,
+                "total_tokens": len(prompt) // 4 + completion_tokens,
+            }
+            queue_time = max(0.0, latency + rng.uniform(-jitter, jitter))
+            # Groq-style timings, so metrics.Trace records queue and generation time
+            usage.update(
+                queue_time=queue_time,
+                prompt_time=0.0,
+                completion_time=completion_tokens / tokens_per_second,
+                total_time=queue_time + completion_tokens / tokens_per_second,
+            )
+            time.sleep(queue_time)
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+                for piece in pieces:
+                    self._event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]},
+                                body["model"])
+                    time.sleep(4 / tokens_per_second)
+                self._event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                             "x_groq": {"id": "bench", "usage": usage}}, body["model"])
+                self.wfile.write(b"data: [DONE]\n\n")
+                return
+
+            time.sleep(completion_tokens / tokens_per_second)
+            payload = json.dumps({
+                "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _event(self, data, model):
+            data.update({"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()), "model": model})
+            self.wfile.write(b"data: " + json.dumps(data).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def company_site_handler(latency):
+    """Handler serving a small company homepage with about/careers/company pages."""
+    filler = " ".join(f"We build {skill} products." for skill in SKILLS) * 20
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path in ("/", ""):
+                html = ("<html><head><title>Example Corp</title><meta name='description' content='Example Corp "
+                        "makes example things.'></head><body><a href='/about'>About</a>"
+                        "<a href='/careers'>Careers</a><a href='/company'>Company</a>" + filler + "</body></html>")
+            else:
+                html = f"<html><body><h1>{self.path.strip('/').title()}</h1><p>{filler}</p></body></html>"
+            payload = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+# --- Measurement ------------------------------------------------------------
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def run_pipeline(resume_pdf, jd_pdf, company_url, client, cache, store=None, session=None):
+    """Run one request through the same stages as main() and time each one.
+
+    With ``store``, the texts and result are kept under ``session`` the way
+    the app keeps a session's artifacts.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    resume_text, _ = analysis.extract_pdf_text(resume_pdf)
+    jd_text, _ = analysis.extract_pdf_text(jd_pdf)
+    timings["extract"] = time.perf_counter() - start
+
+    # The app reads profiles through the company store, which scrapes only the first time;
+    # a direct scrape keeps the cost of a cold lookup measured on every request
+    start = time.perf_counter()
+    analysis.scrape_company_info(company_url)
+    scrape_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    company_info = analysis.fetch_company_info(company_url)
+    timings["company_store"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keywords = analysis.keyword_report(resume_text, jd_text)
+    timings["keywords"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prompt = analysis.build_analysis_prompt(jd_text, resume_text, company_info, keywords=keywords)
+    timings["prompt"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result, _, _ = analysis.request_analysis(prompt, client, cache, use_cache=False)
+    result = analysis.apply_keywords(result, keywords)
+    timings["analyze"] = time.perf_counter() - start
+    if result.error:
+        raise RuntimeError(result.error)
+
+    # Rendering itself needs a Streamlit session; time the card preparation it does
+    start = time.perf_counter()
+    for title, content in result.sections:
+        content.replace("\n", "<br>")
+    timings["format"] = time.perf_counter() - start
+    if store is not None:
+        store.put(session, ("view", uuid.uuid4().hex), (resume_text, jd_text, result))
+
+    timings["total"] = sum(timings.values())
+    # Reported, but not part of the total: the app path above does not scrape again
+    timings["scrape"] = scrape_seconds
+    return timings
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    """Print per-stage p50/p95 changes relative to an earlier result file."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path} (revision {previous.get('revision')}):")
+    for stage, stats in current["stages"].items():
+        before = previous.get("stages", {}).get(stage)
+        if not before:
+            continue
+        changes = []
+        for key in ("p50", "p95"):
+            if before.get(key):
+                changes.append(f"{key} {(stats[key] - before[key]) / before[key]:+.0%}")
+        print(f"  {stage:<13} " + ", ".join(changes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per concurrency level (default 20)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3, 10, 30],
+                        help="Resume/JD page counts to cycle through")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Stand-in time to first token (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=800.0, help="Stand-in generation speed")
+    parser.add_argument("--site-latency", type=float, default=0.15, help="Company site response time (s)")
+    parser.add_argument("--sessions", type=int, default=50,
+                        help="Simulated sessions keeping their results in the artifact store (default 50)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Result file (default benchmark_results/<time>-<revision>.json)")
+    parser.add_argument("--compare", metavar="PATH", help="Earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    documents = [(synthetic_resume(rng, pages), synthetic_jd(rng, max(1, pages // 3)), pages) for pages in args.pages]
+
+    stage_samples = {}
+    by_pages = {}
+    throughput = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            StandInServer(groq_handler(args.llm_latency, args.llm_jitter, args.tokens_per_second, args.seed)) as groq, \
+            StandInServer(company_site_handler(args.site_latency)) as site:
+        client = analysis.create_groq_client("benchmark", base_url=groq.url)
+        cache = llm_cache.ResponseCache(os.path.join(tmp, "responses.sqlite3"))
+        # Start with no stored company profiles, so company_store includes the first (cold) lookup
+        os.environ["COMPANY_STORE_PATH"] = os.path.join(tmp, "company_profiles.sqlite3")
+        store = session_store.store_from_env()
+        request_number = 0
+
+        for concurrency in args.concurrency:
+            jobs = [documents[i % len(documents)] for i in range(args.requests)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = []
+                for resume_pdf, jd_pdf, pages in jobs:
+                    session = f"session-{request_number % max(1, args.sessions)}"
+                    request_number += 1
+                    futures.append((pages, executor.submit(
+                        run_pipeline, resume_pdf, jd_pdf, site.url + "/", client, cache, store, session
+                    )))
+                for pages, future in futures:
+                    timings = future.result()
+                    for stage, seconds in timings.items():
+                        stage_samples.setdefault(stage, []).append(seconds)
+                    by_pages.setdefault(pages, []).append(timings["extract"])
+            elapsed = time.perf_counter() - started
+            throughput.append({
+                "concurrency": concurrency,
+                "requests": len(jobs),
+                "seconds": elapsed,
+                "requests_per_second": len(jobs) / elapsed,
+            })
+            print(f"concurrency {concurrency:>3}: {len(jobs)} requests in {elapsed:.2f}s "
+                  f"({len(jobs) / elapsed:.2f} req/s)")
+
+    result = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "stages": {stage: summarize(samples) for stage, samples in stage_samples.items()},
+        "extract_by_pages": {str(pages): summarize(samples) for pages, samples in sorted(by_pages.items())},
+        "throughput": throughput,
+        "memory": session_store.memory_report(store),
+    }
+
+    print(f"\n{'stage':<13} {'p50':>8} {'p95':>8} {'p99':>8}  (seconds)")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<13} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['p99']:>8.3f}")
+
+    memory = result["memory"]
+    print(
+        f"\nmemory: peak RSS {(memory['peak_rss_bytes'] or 0) / 1e6:.0f} MB, session store "
+        f"{memory['session_store_bytes'] / 1e6:.1f} of {memory['session_store_max_bytes'] / 1e6:.0f} MB "
+        f"({memory['session_store_entries']} artifacts in {memory['session_store_sessions']} sessions, "
+        f"{memory['session_store_evictions']} evicted)"
+    )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{result['revision'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Persistent company profiles keyed by domain, refreshed in the background.
+
+    python company_store.py warm https://acme.com targets.txt   # scrape profiles ahead of time
+    python company_store.py stats                               # stored profiles and lookup counters
+    python company_store.py show acme.com                       # one stored profile
+
+Every candidate applying to the same employer used to scrape its site
+again, at up to two blocking 10-second requests. Profiles (name,
+description, about text) are now stored per domain and served
+immediately: a fresh profile as is, a stale one while a background
+thread scrapes the site again. Only a domain never seen (or not seen for
+COMPANY_MAX_AGE_SECONDS) is scraped while the caller waits. A failed
+scrape is remembered for COMPANY_ERROR_SECONDS, so a dead site fails
+fast instead of stalling every analysis.
+
+    COMPANY_STORE_PATH       SQLite database (default .cache/company_profiles.sqlite3)
+    COMPANY_FRESH_SECONDS    Profiles younger than this are served without a refresh (default 1 day)
+    COMPANY_MAX_AGE_SECONDS  Older profiles are scraped again before use (default 30 days)
+    COMPANY_ERROR_SECONDS    How long a failed scrape is remembered (default 300)
+    COMPANY_REFRESH_WORKERS  Background refresh threads (default 2)
+    COMPANY_PREWARM_PATH     File of company URLs, one per line, refreshed in the background on start-up
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import metrics
+import singleflight
+
+DEFAULT_DB_PATH = os.path.join(".cache", "company_profiles.sqlite3")
+DEFAULT_FRESH_SECONDS = 24 * 3600
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+DEFAULT_ERROR_SECONDS = 300
+DEFAULT_REFRESH_WORKERS = 2
+
+
+class CompanyUnavailable(Exception):
+    """Raised while a recent scrape of the domain failed and has not been retried yet."""
+
+
+def domain_key(url):
+    """Return the store key for a company URL: its lowercased host (and port) without "www."."""
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def read_targets(path):
+    """Read company URLs from a file, one per line; blank lines and # comments are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class CompanyStore:
+    """Profiles from ``scrape(url)`` stored per domain, served stale-while-revalidate.
+
+    ``scrape`` returns a JSON-serializable profile dict or raises.
+    """
+
+    def __init__(self, scrape, db_path=DEFAULT_DB_PATH, fresh_seconds=DEFAULT_FRESH_SECONDS,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS, error_seconds=DEFAULT_ERROR_SECONDS,
+                 refresh_workers=DEFAULT_REFRESH_WORKERS):
+        self.scrape = scrape
+        self.db_path = db_path
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.error_seconds = error_seconds
+        self.refresh_workers = refresh_workers
+        self._lock = threading.Lock()
+        self._stats = {"fresh": 0, "stale": 0, "misses": 0, "cached_errors": 0, "refreshes": 0, "failures": 0}
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._threads = []
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    domain TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    profile TEXT,
+                    fetched_at REAL,
+                    error TEXT,
+                    failed_at REAL
+                )
+                """
+            )
+
+    def _row(self, domain):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT profile, fetched_at, error, failed_at FROM profiles WHERE domain = ?", (domain,)
+            ).fetchone()
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+        metrics.REGISTRY.inc("company_profile_lookups_total", outcome=outcome)
+
+    def update(self, url):
+        """Scrape and store the profile now, or record the failure and raise.
+
+        Concurrent scrapes of one domain share a single request.
+        """
+        domain = domain_key(url)
+
+        def scrape():
+            try:
+                profile = self.scrape(url)
+            except Exception as e:
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "INSERT INTO profiles (domain, url, error, failed_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(domain) DO UPDATE SET error = excluded.error, failed_at = excluded.failed_at",
+                        (domain, url, str(e) or type(e).__name__, time.time()),
+                    )
+                    self._stats["failures"] += 1
+                metrics.REGISTRY.inc("company_profile_scrapes_total", status="failed")
+                raise
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO profiles (domain, url, profile, fetched_at) VALUES (?, ?, ?, ?)",
+                    (domain, url, json.dumps(profile), time.time()),
+                )
+            metrics.REGISTRY.inc("company_profile_scrapes_total", status="ok")
+            return profile
+
+        profile, _ = singleflight.COMPANIES.do(domain, scrape)
+        return profile
+
+    def get(self, url):
+        """Return the profile for ``url``'s domain, scraping only if none usable is stored.
+
+        Raises CompanyUnavailable while a recent failure is remembered, or
+        the scrape's own error.
+        """
+        domain = domain_key(url)
+        row = self._row(domain)
+        now = time.time()
+        if row is not None:
+            profile, fetched_at, error, failed_at = row
+            failed_recently = failed_at is not None and now - failed_at < self.error_seconds
+            if profile is not None and now - fetched_at < self.max_age_seconds:
+                if now - fetched_at < self.fresh_seconds:
+                    self._count("fresh")
+                else:
+                    self._count("stale")
+                    # A failing site is not retried on every lookup
+                    if not failed_recently:
+                        self.refresh(url)
+                return json.loads(profile)
+            if failed_recently:
+                self._count("cached_errors")
+                retry_in = self.error_seconds - (now - failed_at)
+                raise CompanyUnavailable(f"{error} (failed recently; retrying in {retry_in:.0f}s)")
+        self._count("misses")
+        return self.update(url)
+
+    def refresh(self, url):
+        """Queue a background scrape of ``url`` unless one is already queued for its domain."""
+        domain = domain_key(url)
+        with self._lock:
+            if domain in self._pending:
+                return False
+            self._pending.add(domain)
+            if not self._threads:
+                for i in range(max(1, self.refresh_workers)):
+                    thread = threading.Thread(target=self._work, name=f"company-refresh-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        self._queue.put(url)
+        return True
+
+    def _work(self):
+        while True:
+            url = self._queue.get()
+            try:
+                self.update(url)
+                with self._lock:
+                    self._stats["refreshes"] += 1
+            except Exception:
+                pass  # Recorded as a failure; the stored profile keeps being served
+            finally:
+                with self._lock:
+                    self._pending.discard(domain_key(url))
+
+    def prewarm(self, urls):
+        """Queue background scrapes for the URLs without a fresh profile; returns how many were queued."""
+        now = time.time()
+        queued = 0
+        for url in urls:
+            row = self._row(domain_key(url))
+            if row is not None and row[0] is not None and now - row[1] < self.fresh_seconds:
+                continue
+            queued += self.refresh(url)
+        return queued
+
+    def profile(self, domain):
+        """Return the stored row for a domain as a dict (profile, ages and last error), or None."""
+        row = self._row(domain_key(domain))
+        if row is None:
+            return None
+        profile, fetched_at, error, failed_at = row
+        return {
+            "profile": json.loads(profile) if profile else None,
+            "fetched_at": fetched_at,
+            "error": error,
+            "failed_at": failed_at,
+        }
+
+    def stats(self):
+        """Return lookup counters with the number of stored profiles and queued refreshes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["profiles"] = self._conn.execute(
+                "SELECT COUNT(*) FROM profiles WHERE profile IS NOT NULL"
+            ).fetchone()[0]
+            stats["refreshing"] = len(self._pending)
+        lookups = stats["fresh"] + stats["stale"] + stats["misses"] + stats["cached_errors"]
+        stats["hit_rate"] = (stats["fresh"] + stats["stale"]) / lookups if lookups else 0.0
+        return stats
+
+
+def store_from_env(scrape):
+    """Build a CompanyStore from COMPANY_* environment variables and queue the COMPANY_PREWARM_PATH targets."""
+    store = CompanyStore(
+        scrape,
+        db_path=os.environ.get("COMPANY_STORE_PATH", DEFAULT_DB_PATH),
+        fresh_seconds=float(os.environ.get("COMPANY_FRESH_SECONDS", DEFAULT_FRESH_SECONDS)),
+        max_age_seconds=float(os.environ.get("COMPANY_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)),
+        error_seconds=float(os.environ.get("COMPANY_ERROR_SECONDS", DEFAULT_ERROR_SECONDS)),
+        refresh_workers=int(os.environ.get("COMPANY_REFRESH_WORKERS", DEFAULT_REFRESH_WORKERS)),
+    )
+    if os.environ.get("COMPANY_PREWARM_PATH"):
+        store.prewarm(read_targets(os.environ["COMPANY_PREWARM_PATH"]))
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the company profile store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm_parser = commands.add_parser("warm", help="Scrape profiles for company URLs or files listing them")
+    warm_parser.add_argument("targets", nargs="+")
+    warm_parser.add_argument("--force", action="store_true", help="Scrape even profiles that are still fresh")
+    warm_parser.add_argument("--workers", type=int, default=8, help="Sites scraped at once (default 8)")
+    commands.add_parser("stats")
+    show_parser = commands.add_parser("show", help="Print the stored profile of a domain")
+    show_parser.add_argument("domain")
+    args = parser.parse_args(argv)
+
+    import analysis
+    store = analysis.company_profiles()
+    if args.command == "stats":
+        print(store.stats())
+        return
+    if args.command == "show":
+        row = store.profile(args.domain)
+        if row is None:
+            raise SystemExit(f"No profile for {domain_key(args.domain)}")
+        print(json.dumps(row, indent=2))
+        return
+
+    urls = []
+    for target in args.targets:
+        urls.extend(read_targets(target) if os.path.isfile(target) else [target])
+
+    def warm(url):
+        row = store.profile(url)
+        if not args.force and row and row["profile"] and time.time() - row["fetched_at"] < store.fresh_seconds:
+            return "fresh"
+        try:
+            return store.update(url)["name"]
+        except Exception as e:
+            return f"failed ({e})"
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        for url, outcome in zip(urls, executor.map(warm, urls)):
+            print(f"{domain_key(url)}: {outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Persistent inverted index over a library of job descriptions.
+
+    python jd_index.py add jobs/                 # index PDFs/text files (re-run to update)
+    python jd_index.py search resume.pdf -k 10   # best-matching JDs for a resume
+    python jd_index.py list                      # keys and names of the indexed JDs
+    python jd_index.py remove jobs/old.pdf
+    python jd_index.py stats
+
+Postings (term -> document, term frequency) live in SQLite, clustered by
+term, alongside per-term document frequencies and corpus totals. Adding,
+updating or removing a JD only touches that document's own terms, and a
+query reads the postings of at most MAX_QUERY_TERMS of the resume's most
+distinctive terms, so neither step scans the whole corpus. Documents are
+ranked with BM25, using the resume as the query.
+"""
+import argparse
+import hashlib
+import heapq
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+from tokenizer import tokenize
+
+DEFAULT_DB_PATH = "jd_library.sqlite3"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Resume terms with the highest query weight that are looked up; caps query cost
+MAX_QUERY_TERMS = 64
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def _batches(items, size=_SQL_BATCH):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class JDIndex:
+    """Inverted index of JD texts keyed by a caller-chosen id (e.g. the file path)."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL UNIQUE,
+                    name TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    added_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT PRIMARY KEY,
+                    df INTEGER NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS corpus (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    doc_count INTEGER NOT NULL,
+                    total_length INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO corpus (id, doc_count, total_length) VALUES (0, 0, 0);
+                """
+            )
+
+    def _remove_locked(self, doc_id, length, terms):
+        self._conn.executemany(
+            "UPDATE terms SET df = df - 1 WHERE term = ?", [(term,) for term in terms]
+        )
+        self._conn.execute("DELETE FROM terms WHERE df <= 0")
+        self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self._conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+        self._conn.execute(
+            "UPDATE corpus SET doc_count = doc_count - 1, total_length = total_length - ? WHERE id = 0", (length,)
+        )
+
+    def _doc_terms(self, doc_id):
+        return [row[0] for row in self._conn.execute("SELECT term FROM postings WHERE doc_id = ?", (doc_id,))]
+
+    def add_many(self, documents):
+        """Index ``(key, name, text)`` tuples in one transaction.
+
+        Unchanged documents are skipped and changed ones re-indexed.
+        Returns the number of documents (re-)indexed.
+        """
+        indexed = 0
+        with self._lock, self._conn:
+            for key, name, text in documents:
+                content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                row = self._conn.execute(
+                    "SELECT id, content_hash, length FROM documents WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    doc_id, old_hash, old_length = row
+                    if old_hash == content_hash:
+                        continue
+                    self._remove_locked(doc_id, old_length, self._doc_terms(doc_id))
+
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                doc_id = self._conn.execute(
+                    "INSERT INTO documents (key, name, text, content_hash, length, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, name or key, text, content_hash, length, time.time()),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in counts.items()],
+                )
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(term,) for term in counts],
+                )
+                self._conn.execute(
+                    "UPDATE corpus SET doc_count = doc_count + 1, total_length = total_length + ? WHERE id = 0",
+                    (length,),
+                )
+                indexed += 1
+        return indexed
+
+    def add(self, key, text, name=None):
+        """Index one document; returns False if it was already indexed unchanged."""
+        return bool(self.add_many([(key, name, text)]))
+
+    def remove(self, key):
+        """Drop a document from the index; returns False if it was not indexed."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id, length FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            self._remove_locked(row[0], row[1], self._doc_terms(row[0]))
+        return True
+
+    def entries(self):
+        """Return the indexed documents as dicts with key, name, content_hash and added_at, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, name, content_hash, added_at FROM documents ORDER BY added_at DESC"
+            ).fetchall()
+        return [dict(zip(("key", "name", "content_hash", "added_at"), row)) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT doc_count FROM corpus WHERE id = 0").fetchone()[0]
+
+    def search(self, query_text, k=10):
+        """Return the ``k`` best-matching JDs as dicts with key, name, score and text, best first."""
+        query_counts = Counter(tokenize(query_text))
+        if not query_counts or k <= 0:
+            return []
+
+        with self._lock:
+            doc_count, total_length = self._conn.execute(
+                "SELECT doc_count, total_length FROM corpus WHERE id = 0"
+            ).fetchone()
+            if not doc_count:
+                return []
+            df = {}
+            for batch in _batches(query_counts):
+                placeholders = ",".join("?" * len(batch))
+                df.update(self._conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", batch))
+
+            # Weight query terms by rarity and repetition in the resume; keep only the strongest
+            idf = {term: math.log(1 + (doc_count - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+            query_weights = {
+                term: idf[term] * query_counts[term] / (query_counts[term] + BM25_K1) for term in idf
+            }
+            query_terms = heapq.nlargest(MAX_QUERY_TERMS, query_weights, key=query_weights.get)
+
+            avg_length = total_length / doc_count
+            scores = {}
+            for batch in _batches(query_terms):
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN documents d ON d.id = p.doc_id "
+                    f"WHERE p.term IN ({placeholders})",
+                    batch,
+                )
+                for term, doc_id, tf, length in rows:
+                    length_norm = 1 - BM25_B + BM25_B * length / avg_length
+                    weight = tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + query_weights[term] * weight
+
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            results = []
+            for doc_id, score in top:
+                key, name, text = self._conn.execute(
+                    "SELECT key, name, text FROM documents WHERE id = ?", (doc_id,)
+                ).fetchone()
+                results.append({"key": key, "name": name, "score": score, "text": text})
+        return results
+
+    def stats(self):
+        """Return corpus size, vocabulary size and average document length."""
+        with self._lock:
+            doc_count, total_length = self._conn.execute(
+                "SELECT doc_count, total_length FROM corpus WHERE id = 0"
+            ).fetchone()
+            vocabulary = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {
+            "documents": doc_count,
+            "terms": vocabulary,
+            "avg_length": total_length / doc_count if doc_count else 0.0,
+        }
+
+
+def index_from_env():
+    """Open the JD library at JD_INDEX_PATH."""
+    return JDIndex(os.environ.get("JD_INDEX_PATH", DEFAULT_DB_PATH))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage and query the job-description library.")
+    parser.add_argument("--index", help=f"Index database (default: $JD_INDEX_PATH or {DEFAULT_DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Index JD files or directories; changed files are re-indexed")
+    add_parser.add_argument("paths", nargs="+")
+    remove_parser = commands.add_parser("remove", help="Remove JDs by key (the path they were added with)")
+    remove_parser.add_argument("keys", nargs="+")
+    commands.add_parser("list", help="List the indexed JDs with their keys")
+    search_parser = commands.add_parser("search", help="List the best-matching JDs for a resume")
+    search_parser.add_argument("resume")
+    search_parser.add_argument("-k", type=int, default=10)
+    commands.add_parser("stats")
+    args = parser.parse_args(argv)
+
+    import analysis  # Imported lazily: the app imports this module
+    index = JDIndex(args.index) if args.index else index_from_env()
+    if args.command == "add":
+        paths = analysis.discover_files(args.paths)
+        start = time.perf_counter()
+        documents = []
+        for path in paths:
+            try:
+                documents.append((path, os.path.basename(path), analysis.read_document(path)))
+            except Exception as e:
+                print(f"Skipping unreadable document {path}: {e}", file=sys.stderr)
+        indexed = index.add_many(document for document in documents if document[2].strip())
+        print(f"Indexed {indexed} of {len(paths)} documents in {time.perf_counter() - start:.2f}s "
+              f"({len(index)} in library)")
+    elif args.command == "remove":
+        for key in args.keys:
+            print(f"{key}: {'removed' if index.remove(key) else 'not indexed'}")
+    elif args.command == "list":
+        for entry in index.entries():
+            print(f"{entry['key']}  {entry['name']}")
+    elif args.command == "search":
+        start = time.perf_counter()
+        results = index.search(analysis.read_document(args.resume), k=args.k)
+        elapsed = time.perf_counter() - start
+        for rank, result in enumerate(results, start=1):
+            print(f"{rank:>3}. {result['score']:7.2f}  {result['name']}  ({result['key']})")
+        print(f"Searched {len(index)} JDs in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    else:
+        print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Background analysis jobs persisted in SQLite.
+
+    python job_queue.py stats          # queue depth and job counts
+    python job_queue.py show JOB_ID    # status and result of one job
+
+The app submits an analysis as a job and polls it, so a slow Groq call
+does not hold the session and a browser refresh can reopen the job by
+id. A pool of worker threads claims queued jobs in submission order and
+stores each job's JSON result or error. Each process marks the jobs it
+runs with its own owner token (host, pid and a random boot id) and
+refreshes their heartbeat while they run. Jobs left running by a process
+that is gone are queued again: at once when it ran on this host (a
+restarted container reusing the PID included), and once the heartbeat
+is older than JOB_LEASE_SECONDS otherwise.
+
+    JOB_DB_PATH          SQLite database (default .cache/jobs.sqlite3)
+    JOB_WORKERS          Worker threads per process (default 2)
+    JOB_QUEUE_MAX        Queued jobs accepted before submissions are refused (default 100)
+    JOB_RETENTION_DAYS   Finished jobs older than this are deleted on start-up (default 7)
+    JOB_LEASE_SECONDS    Heartbeat age after which another host's running job is requeued (default 60)
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import metrics
+
+DEFAULT_DB_PATH = os.path.join(".cache", "jobs.sqlite3")
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_MAX = 100
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_LEASE_SECONDS = 60
+
+STATUSES = ("queued", "running", "done", "failed")
+
+Job = namedtuple(
+    "Job", ["id", "kind", "status", "payload", "result", "error", "created_at", "started_at", "finished_at"]
+)
+
+
+class QueueFull(Exception):
+    """Raised by ``submit`` when the queue already holds ``max_queued`` jobs."""
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+_owner_token = None
+
+
+def owner_token():
+    """Return "host:pid:boot id" for this process; a new process never reuses one, even with the same PID."""
+    global _owner_token
+    if _owner_token is None or _owner_token.split(":")[1] != str(os.getpid()):
+        _owner_token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return _owner_token
+
+
+class JobQueue:
+    """Persistent FIFO of jobs run by ``workers`` threads through per-kind handlers.
+
+    A handler takes the job's payload dict and returns a JSON-serializable
+    result; an exception marks the job failed with its message.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, workers=DEFAULT_WORKERS, max_queued=DEFAULT_QUEUE_MAX,
+                 retention_days=DEFAULT_RETENTION_DAYS, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self._handlers = {}
+        self._threads = []
+        self._wake = threading.Condition()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - retention_days * 86400,),
+            )
+        self._requeue_orphans()
+
+    def _orphaned(self, owner, heartbeat_at, now):
+        if owner is None:
+            return True
+        owner = str(owner)
+        if owner == owner_token():
+            return False
+        if owner.isdigit():
+            host, pid = socket.gethostname(), int(owner)  # Written before owners carried a host
+        else:
+            host, pid, _ = owner.split(":")
+            pid = int(pid)
+        if host == socket.gethostname():
+            # Our own PID under another token means the owner died and this process reused its PID
+            return pid == os.getpid() or not _pid_alive(pid)
+        # Another host's PIDs cannot be checked from here; go by its heartbeat
+        return heartbeat_at is None or now - heartbeat_at > self.lease_seconds
+
+    def _requeue_orphans(self):
+        """Queue again the running jobs whose owner process is gone; returns how many."""
+        now = time.time()
+        with self._lock, self._conn:
+            running = self._conn.execute("SELECT id, owner, heartbeat_at FROM jobs WHERE status = 'running'").fetchall()
+            orphans = [job_id for job_id, owner, heartbeat_at in running if self._orphaned(owner, heartbeat_at, now)]
+            for job_id in orphans:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, started_at = NULL, heartbeat_at = NULL "
+                    "WHERE id = ? AND status = 'running'",
+                    (job_id,),
+                )
+        if orphans:
+            metrics.REGISTRY.inc("jobs_requeued_total", len(orphans))
+        return len(orphans)
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Start the worker threads (once); call after registering handlers."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(max(1, self.workers)):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        with self._wake:
+            self._wake.notify_all()
+
+    def submit(self, kind, payload):
+        """Queue a job and return its id; raises QueueFull when the queue is at capacity."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._conn:
+            queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                metrics.REGISTRY.inc("jobs_rejected_total", kind=kind)
+                raise QueueFull(f"The analysis queue is full ({queued} jobs waiting); try again shortly")
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), time.time()),
+            )
+        metrics.REGISTRY.inc("jobs_submitted_total", kind=kind)
+        self._export_depth()
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Return the Job with that id, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, payload, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(
+            row[0], row[1], row[2], json.loads(row[3]), json.loads(row[4]) if row[4] else None, *row[5:]
+        )
+
+    def position(self, job_id):
+        """Number of queued jobs ahead of this one (0 once it is running or finished)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' "
+                "AND created_at < (SELECT created_at FROM jobs WHERE id = ? AND status = 'queued')",
+                (job_id,),
+            ).fetchone()
+        return row[0]
+
+    def stats(self):
+        """Return job counts per status plus the worker and capacity settings."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        stats = {status: counts.get(status, 0) for status in STATUSES}
+        stats.update(workers=self.workers, max_queued=self.max_queued)
+        return stats
+
+    def _export_depth(self):
+        stats = self.stats()
+        for status in ("queued", "running"):
+            metrics.REGISTRY.set_gauge("jobs_in_queue", stats[status], status=status)
+        metrics.REGISTRY.set_gauge("job_workers", self.workers)
+
+    def _claim(self):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, kind, payload, created_at FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            # Another process sharing the database may have claimed it first
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, started_at = ?, heartbeat_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (owner_token(), now, now, row[0]),
+            ).rowcount
+        return row if claimed else self._claim()
+
+    def _finish(self, job_id, result=None, error=None):
+        """Store the job's result or error; returns the final status."""
+        encoded = None
+        if not error:
+            try:
+                encoded = json.dumps(result)
+            except (TypeError, ValueError) as e:
+                error = f"Job result could not be stored: {e}"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "done", encoded, error, time.time(), job_id),
+            )
+        return "failed" if error else "done"
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(max(1, self.lease_seconds / 3))
+            try:
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'",
+                        (time.time(), owner_token()),
+                    )
+                requeued = self._requeue_orphans()
+            except sqlite3.Error:
+                metrics.REGISTRY.inc("job_worker_errors_total", stage="heartbeat")
+                continue
+            if requeued:
+                with self._wake:
+                    self._wake.notify_all()
+
+    def _work(self):
+        while True:
+            job_id = None
+            try:
+                job = self._claim()
+                if job is None:
+                    with self._wake:
+                        # Woken by submit; the timeout picks up jobs queued by other processes
+                        self._wake.wait(timeout=2)
+                    continue
+                job_id, kind, payload, created_at = job
+                metrics.REGISTRY.observe("job_wait_seconds", time.time() - created_at, kind=kind)
+                self._export_depth()
+                start = time.perf_counter()
+                try:
+                    result = self._handlers[kind](json.loads(payload))
+                except Exception as e:
+                    status = self._finish(job_id, error=str(e) or type(e).__name__)
+                else:
+                    status = self._finish(job_id, result=result)
+                metrics.REGISTRY.observe("job_run_seconds", time.perf_counter() - start, kind=kind)
+                metrics.REGISTRY.inc("jobs_finished_total", kind=kind, status=status)
+                self._export_depth()
+            except Exception as e:
+                # A database error (e.g. still locked after the timeout) must not end the worker thread
+                metrics.REGISTRY.inc("job_worker_errors_total", stage="work")
+                if job_id is not None:
+                    try:
+                        self._finish(job_id, error=f"Job could not be completed: {e}")
+                    except Exception:
+                        pass  # Left running; requeued once this process is gone
+                time.sleep(1)
+
+
+def queue_from_env():
+    """Create a job queue configured from JOB_* environment variables (workers not started)."""
+    return JobQueue(
+        db_path=os.environ.get("JOB_DB_PATH", DEFAULT_DB_PATH),
+        workers=int(os.environ.get("JOB_WORKERS", DEFAULT_WORKERS)),
+        max_queued=int(os.environ.get("JOB_QUEUE_MAX", DEFAULT_QUEUE_MAX)),
+        retention_days=float(os.environ.get("JOB_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)),
+        lease_seconds=float(os.environ.get("JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the background analysis job queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    show_parser = commands.add_parser("show", help="Print one job's status and result")
+    show_parser.add_argument("job_id")
+    args = parser.parse_args(argv)
+
+    queue = queue_from_env()
+    if args.command == "stats":
+        print(queue.stats())
+        return
+    job = queue.get(args.job_id)
+    if job is None:
+        raise SystemExit(f"No job {args.job_id}")
+    print(json.dumps({field: value for field, value in job._asdict().items() if field != "payload"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
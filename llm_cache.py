@@ -0,0 +1,133 @@
+"""Persistent SQLite cache for LLM responses keyed on the normalized prompt."""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join(".cache", "llm_responses.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+class ResponseCache:
+    """Completion text and token usage, keyed on prompt, model and sampling settings.
+
+    Entries expire after ``ttl_seconds``; once the table holds more than
+    ``max_entries`` rows the least recently used ones are deleted.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    usage TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def key_for(prompt, model, temperature, max_tokens=None):
+        """Return the cache key for a request."""
+        payload = json.dumps(
+            [normalize_prompt(prompt), model, round(float(temperature), 4), max_tokens]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return ``(text, usage)`` for a live entry, or None."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT text, usage, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            text, usage, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._stats["hits"] += 1
+        return text, json.loads(usage)
+
+    def put(self, key, model, text, usage=None):
+        """Store a completion and its token usage, evicting old entries if needed."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, text, usage, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, text, json.dumps(usage or {}), now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self._stats["evictions"] += count - self.max_entries
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def usage_to_dict(usage):
+    """Convert an API usage object into a plain dict of token counts and Groq timings."""
+    if usage is None:
+        return {}
+    usage_dict = {
+        field: getattr(usage, field, None)
+        for field in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    # Groq also reports where the time went (seconds); other providers omit these
+    for field in ("queue_time", "prompt_time", "completion_time", "total_time"):
+        if getattr(usage, field, None) is not None:
+            usage_dict[field] = getattr(usage, field)
+    return usage_dict
+
+
+def cache_from_env():
+    """Build a ResponseCache configured from LLM_CACHE_* environment variables."""
+    return ResponseCache(
+        db_path=os.environ.get("LLM_CACHE_PATH", DEFAULT_DB_PATH),
+        ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    )
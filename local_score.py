@@ -0,0 +1,221 @@
+"""Local resume/JD match scoring without an LLM call.
+
+Documents are tokenized, weighted with BM25-style term-frequency saturation
+and inverse document frequencies, and compared with cosine similarity. The
+raw similarity is mapped to a 0-100% score with a linear calibration fitted
+against LLM scores (see ``python local_score.py --help``).
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from tokenizer import tokenize
+
+DEFAULT_CALIBRATION_PATH = "local_score_calibration.json"
+
+# Uncalibrated mapping: a cosine of 0.6 or more is treated as a perfect match
+DEFAULT_SLOPE = 100 / 0.6
+DEFAULT_INTERCEPT = 0.0
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class LocalScorer:
+    """BM25-weighted cosine similarity between two documents."""
+
+    def __init__(self, idf=None, default_idf=1.0, avg_doc_len=None,
+                 slope=DEFAULT_SLOPE, intercept=DEFAULT_INTERCEPT):
+        self.idf = idf or {}
+        self.default_idf = default_idf
+        self.avg_doc_len = avg_doc_len
+        self.slope = slope
+        self.intercept = intercept
+
+    def fit(self, documents):
+        """Learn document frequencies and average length from sample texts."""
+        token_lists = [tokenize(document) for document in documents]
+        doc_count = len(token_lists)
+        if not doc_count:
+            return self
+        df = {}
+        for tokens in token_lists:
+            for term in set(tokens):
+                df[term] = df.get(term, 0) + 1
+        self.idf = {
+            term: math.log(1 + (doc_count - freq + 0.5) / (freq + 0.5))
+            for term, freq in df.items()
+        }
+        # Unseen terms are treated as rare
+        self.default_idf = math.log(1 + (doc_count + 0.5) / 0.5)
+        self.avg_doc_len = sum(len(tokens) for tokens in token_lists) / doc_count
+        return self
+
+    def vectorize(self, tokens, avg_doc_len):
+        """Return ``(terms, weights)`` with terms sorted for alignment."""
+        if not tokens:
+            return np.array([], dtype=object), np.array([], dtype=float)
+        terms, counts = np.unique(np.array(tokens, dtype=object), return_counts=True)
+        tf = counts.astype(float)
+        length_norm = 1 - BM25_B + BM25_B * len(tokens) / max(avg_doc_len, 1.0)
+        saturated = tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+        idf = np.fromiter(
+            (self.idf.get(term, self.default_idf) for term in terms), dtype=float, count=len(terms)
+        )
+        return terms, saturated * idf
+
+    def similarity(self, resume_text, jd_text):
+        """Return the cosine similarity (0-1) between resume and JD."""
+        resume_tokens = tokenize(resume_text)
+        jd_tokens = tokenize(jd_text)
+        avg_doc_len = self.avg_doc_len or (len(resume_tokens) + len(jd_tokens)) / 2
+        resume_terms, resume_weights = self.vectorize(resume_tokens, avg_doc_len)
+        jd_terms, jd_weights = self.vectorize(jd_tokens, avg_doc_len)
+        return _cosine(resume_terms, resume_weights, jd_terms, jd_weights)
+
+    def similarities(self, resume_text, jd_texts):
+        """Return one cosine similarity per JD for a single resume."""
+        resume_tokens = tokenize(resume_text)
+        jd_token_lists = [tokenize(jd_text) for jd_text in jd_texts]
+        results = np.zeros(len(jd_token_lists))
+        for i, jd_tokens in enumerate(jd_token_lists):
+            avg_doc_len = self.avg_doc_len or (len(resume_tokens) + len(jd_tokens)) / 2
+            resume_vec = self.vectorize(resume_tokens, avg_doc_len)
+            results[i] = _cosine(*resume_vec, *self.vectorize(jd_tokens, avg_doc_len))
+        return results
+
+    def to_percent(self, similarity):
+        """Map a raw similarity to a 0-100 match score."""
+        return int(round(min(100.0, max(0.0, self.slope * similarity + self.intercept))))
+
+    def score(self, resume_text, jd_text):
+        """Return the calibrated 0-100 match score for a resume/JD pair."""
+        return self.to_percent(self.similarity(resume_text, jd_text))
+
+    def to_dict(self):
+        return {
+            "slope": self.slope,
+            "intercept": self.intercept,
+            "avg_doc_len": self.avg_doc_len,
+            "default_idf": self.default_idf,
+            "idf": self.idf,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            idf=data.get("idf"),
+            default_idf=data.get("default_idf", 1.0),
+            avg_doc_len=data.get("avg_doc_len"),
+            slope=data.get("slope", DEFAULT_SLOPE),
+            intercept=data.get("intercept", DEFAULT_INTERCEPT),
+        )
+
+
+def _cosine(terms_a, weights_a, terms_b, weights_b):
+    if not len(terms_a) or not len(terms_b):
+        return 0.0
+    _, idx_a, idx_b = np.intersect1d(terms_a, terms_b, assume_unique=True, return_indices=True)
+    dot = float(np.dot(weights_a[idx_a], weights_b[idx_b]))
+    norm = float(np.linalg.norm(weights_a) * np.linalg.norm(weights_b))
+    return dot / norm if norm else 0.0
+
+
+def load_scorer(path=None):
+    """Load a calibrated scorer, falling back to uncalibrated defaults."""
+    path = path or os.environ.get("LOCAL_SCORE_CALIBRATION", DEFAULT_CALIBRATION_PATH)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return LocalScorer.from_dict(json.load(f))
+    except (OSError, ValueError):
+        return LocalScorer()
+
+
+def _rank(values):
+    order = np.argsort(values, kind="mergesort")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks
+
+
+def calibration_report(similarities, llm_scores, threshold):
+    """Fit a linear map from similarity to LLM score and measure agreement."""
+    x = np.asarray(similarities, dtype=float)
+    y = np.asarray(llm_scores, dtype=float)
+    if len(x) > 1 and np.ptp(x) > 0:
+        slope, intercept = np.polyfit(x, y, 1)
+    else:
+        slope, intercept = DEFAULT_SLOPE, DEFAULT_INTERCEPT
+    predicted = np.clip(slope * x + intercept, 0, 100)
+
+    def correlation(a, b):
+        if len(a) < 2 or np.ptp(a) == 0 or np.ptp(b) == 0:
+            return float("nan")
+        return float(np.corrcoef(a, b)[0, 1])
+
+    passes_llm = y >= threshold
+    passes_local = predicted >= threshold
+    return {
+        "samples": int(len(x)),
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "pearson": correlation(x, y),
+        "spearman": correlation(_rank(x), _rank(y)),
+        "mean_absolute_error": float(np.mean(np.abs(predicted - y))) if len(x) else float("nan"),
+        "gate_threshold": threshold,
+        "gate_kept": int(passes_local.sum()),
+        "gate_false_rejects": int((passes_llm & ~passes_local).sum()),
+        "gate_false_accepts": int((~passes_llm & passes_local).sum()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare local match scores with LLM scores on a sample set."
+    )
+    parser.add_argument(
+        "samples",
+        help="JSONL file with one {\"resume\": path, \"jd\": path, \"llm_score\": int} object per line",
+    )
+    parser.add_argument("--threshold", type=int, default=50, help="Gate threshold to evaluate (default 50)")
+    parser.add_argument(
+        "--write", metavar="PATH",
+        help="Save the fitted scorer (IDF table and calibration) for the app to load",
+    )
+    args = parser.parse_args(argv)
+
+    import analysis  # Imported lazily: only the calibration CLI reads documents
+    base_dir = os.path.dirname(os.path.abspath(args.samples))
+    samples = []
+    with open(args.samples, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                sample = json.loads(line)
+                samples.append((
+                    analysis.read_document(os.path.join(base_dir, sample["resume"])),
+                    analysis.read_document(os.path.join(base_dir, sample["jd"])),
+                    float(sample["llm_score"]),
+                ))
+    if not samples:
+        parser.error("no samples found")
+
+    documents = {text for resume, jd, _ in samples for text in (resume, jd)}
+    scorer = LocalScorer().fit(documents)
+    similarities = [scorer.similarity(resume, jd) for resume, jd, _ in samples]
+    report = calibration_report(similarities, [score for _, _, score in samples], args.threshold)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    if args.write:
+        scorer.slope = report["slope"]
+        scorer.intercept = report["intercept"]
+        with open(args.write, "w", encoding="utf-8") as f:
+            json.dump(scorer.to_dict(), f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Timing spans for one analysis and process-wide metrics.
+
+A ``Trace`` collects the spans of a single analysis (extraction, scraping,
+prompt building, the Groq call, rendering). Finished traces are appended
+to a JSONL log and folded into a ``Registry`` that renders the Prometheus
+text format, either to a sidecar file or on a small HTTP endpoint.
+
+    METRICS_LOG_PATH   JSONL trace log (default .cache/metrics.jsonl; empty disables)
+    METRICS_PROM_PATH  Prometheus text sidecar (default .cache/metrics.prom; empty disables)
+    METRICS_PORT       Serve /metrics on this port (unset disables)
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LOG_PATH = os.path.join(".cache", "metrics.jsonl")
+DEFAULT_PROM_PATH = os.path.join(".cache", "metrics.prom")
+
+METRIC_PREFIX = "resume_analyzer"
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Groq reports these timings (seconds) alongside token counts
+GROQ_TIMINGS = ("queue_time", "prompt_time", "completion_time")
+GROQ_TOKENS = ("prompt_tokens", "completion_tokens")
+
+
+class Trace:
+    """Spans recorded during one analysis, with offsets relative to its start."""
+
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block; the yielded dict takes extra attributes."""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self._append(name, start - self._started, time.perf_counter() - start, attrs)
+
+    def add(self, name, seconds, **attrs):
+        """Record a span that ended just now and was timed elsewhere."""
+        self._append(name, time.perf_counter() - self._started - seconds, seconds, attrs)
+
+    def _append(self, name, offset, seconds, attrs):
+        with self._lock:
+            self.spans.append({"name": name, "start": offset, "seconds": seconds, "attrs": attrs})
+
+    def record_usage(self, usage, cached):
+        """Attach Groq token usage, and Groq-side timings for uncached responses."""
+        usage = usage or {}
+        self.attrs["cached"] = cached
+        for field in GROQ_TOKENS + ("total_tokens",):
+            if usage.get(field) is not None:
+                self.attrs[field] = usage[field]
+        if cached:
+            return
+        # Groq only reports durations; lay them out back to back, ending now
+        timings = [(field, usage[field]) for field in GROQ_TIMINGS if usage.get(field) is not None]
+        start = time.perf_counter() - self._started - sum(seconds for _, seconds in timings)
+        for field, seconds in timings:
+            self._append(f"groq {field.replace('_time', '')}", start, seconds, {"reported_by": "groq"})
+            start += seconds
+
+    def total(self):
+        return time.perf_counter() - self._started
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "timestamp": self.started_at,
+            "seconds": self.total(),
+            "attrs": self.attrs,
+            "spans": sorted(spans, key=lambda span: span["start"]),
+        }
+
+
+class Registry:
+    """Thread-safe counters, gauges and stage-duration histograms."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def record_trace(self, trace):
+        """Fold a finished trace into the counters and histograms."""
+        data = trace.to_dict()
+        self.inc("analyses_total", kind=trace.name, cached=str(bool(data["attrs"].get("cached"))).lower())
+        self.observe("analysis_seconds", data["seconds"], kind=trace.name)
+        for span in data["spans"]:
+            self.observe("stage_seconds", span["seconds"], stage=span["name"])
+        if not data["attrs"].get("cached"):
+            for field in GROQ_TOKENS:
+                if data["attrs"].get(field):
+                    self.inc("groq_tokens_total", data["attrs"][field], kind=field.replace("_tokens", ""))
+
+    def record_cache_stats(self, cache, stats):
+        """Export a cache's ``stats()`` dict as gauges."""
+        self.set_gauge("cache_hit_ratio", stats.get("hit_rate", 0.0), cache=cache)
+        for field in ("hits", "misses", "evictions"):
+            if field in stats:
+                self.set_gauge(f"cache_{field}", stats[field], cache=cache)
+
+    def prometheus_text(self):
+        """Render every metric in the Prometheus text exposition format."""
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._histograms.items()}
+
+        lines = []
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in metrics}):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+                for (metric, labels), value in sorted(metrics.items()):
+                    if metric == name:
+                        lines.append(f"{METRIC_PREFIX}_{name}{labels_text(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} histogram")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f"{METRIC_PREFIX}_{name}_bucket{labels_text(labels, [('le', bound)])} {count}")
+                lines.append(
+                    f"{METRIC_PREFIX}_{name}_bucket{labels_text(labels, [('le', '+Inf')])} {histogram['count']}"
+                )
+                lines.append(f"{METRIC_PREFIX}_{name}_sum{labels_text(labels)} {histogram['sum']}")
+                lines.append(f"{METRIC_PREFIX}_{name}_count{labels_text(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+_write_lock = threading.Lock()
+
+
+def _path_from_env(name, default):
+    path = os.environ.get(name, default)
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+
+def record_trace(trace, cache_stats=None, registry=REGISTRY):
+    """Log a finished trace as JSONL and update the metrics registry and sidecar.
+
+    ``cache_stats`` maps cache names to their ``stats()`` dicts.
+    """
+    registry.record_trace(trace)
+    data = trace.to_dict()
+    for cache, stats in (cache_stats or {}).items():
+        registry.record_cache_stats(cache, stats)
+        data["attrs"][f"{cache}_cache_hit_rate"] = stats.get("hit_rate")
+
+    log_path = _path_from_env("METRICS_LOG_PATH", DEFAULT_LOG_PATH)
+    prom_path = _path_from_env("METRICS_PROM_PATH", DEFAULT_PROM_PATH)
+    with _write_lock:
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(data, default=str) + "\n")
+        if prom_path:
+            # Write then rename, so a scraper never reads a half-written file
+            tmp_path = f"{prom_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(registry.prometheus_text())
+            os.replace(tmp_path, prom_path)
+    return data
+
+
+def serve(port, registry=REGISTRY, host="0.0.0.0"):
+    """Serve ``/metrics`` from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_from_env(registry=REGISTRY):
+    """Start the endpoint if METRICS_PORT is set; returns the server or None."""
+    port = os.environ.get("METRICS_PORT")
+    return serve(int(port), registry) if port else None
@@ -0,0 +1,295 @@
+"""Near-duplicate lookup of earlier analyses with MinHash and LSH.
+
+    python neardup.py stats                      # stored analyses and lookup counters
+    python neardup.py compare a.pdf b.pdf        # estimated similarity of two documents
+
+Uploads are often the same resume re-exported with a new phone number or
+date, which the exact response cache misses. Each analyzed resume/JD pair
+is stored with a MinHash signature of both texts; a new pair is hashed
+the same way and looked up by LSH band, so a lookup reads a handful of
+index rows however many analyses are stored. A candidate is reused when
+both its resume and its JD are at least NEARDUP_THRESHOLD similar and,
+unless disabled, the words that differ are mostly volatile ones (digits,
+emails, links).
+
+    NEARDUP_PATH                SQLite database (default .cache/near_duplicates.sqlite3)
+    NEARDUP_THRESHOLD           Minimum estimated similarity, 0 disables reuse (default 0.9)
+    NEARDUP_MAX_CHANGED_WORDS   Non-volatile words that may differ per document, -1 skips the check (default 5)
+    NEARDUP_TTL_SECONDS         Stored analyses expire after this (default 7 days)
+    NEARDUP_MAX_ENTRIES         Least recently used analyses beyond this are deleted (default 5000)
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+
+import metrics
+
+DEFAULT_DB_PATH = os.path.join(".cache", "near_duplicates.sqlite3")
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAX_CHANGED_WORDS = 5
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+SHINGLE_WORDS = 3
+# 16 bands of 8 rows: pairs above ~0.7 similarity (on both documents) usually share a band
+BANDS = 16
+ROWS = 8
+NUM_PERM = BANDS * ROWS
+# Candidates read per lookup, so a crowded bucket cannot make lookups linear
+MAX_CANDIDATES = 32
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+VOLATILE_RE = re.compile(r"\d|@|^https?:|^www\.")
+
+Match = namedtuple("Match", ["result", "usage", "similarity"])
+Match.__doc__ = """A reusable earlier analysis.
+
+``result`` is the stored result text, ``usage`` its original token usage
+and ``similarity`` the lower of the resume and JD similarities.
+"""
+
+
+def shingles(text):
+    """Return the set of SHINGLE_WORDS-word shingles of ``text``, with digits masked."""
+    words = WORD_RE.findall(re.sub(r"\d", "0", text.lower()))
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """Return the MinHash signature of ``text``, NUM_PERM integers."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles(text)
+    ] or [0]
+    return array("Q", (min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS))
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / NUM_PERM
+
+
+def _buckets(context, resume_signature, jd_signature):
+    # A band matches only if both documents agree on it, so buckets stay specific to the pair
+    buckets = []
+    for band in range(BANDS):
+        rows = slice(band * ROWS, (band + 1) * ROWS)
+        payload = f"{context}:{band}:".encode("utf-8") + resume_signature[rows].tobytes() + jd_signature[rows].tobytes()
+        buckets.append(hashlib.blake2b(payload, digest_size=12).hexdigest())
+    return buckets
+
+
+def _content_words(text):
+    return {word for word in text.lower().split() if not VOLATILE_RE.search(word)}
+
+
+def changed_words(old_text, new_text):
+    """Number of distinct words, ignoring volatile ones, in only one of the two texts."""
+    return len(_content_words(old_text) ^ _content_words(new_text))
+
+
+class NearDuplicateIndex:
+    """Analyses of resume/JD pairs, found again by similarity of both documents.
+
+    ``context`` strings separate analyses that are not interchangeable
+    even for identical documents (other model, sections or company).
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, threshold=DEFAULT_THRESHOLD,
+                 max_changed_words=DEFAULT_MAX_CHANGED_WORDS, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_changed_words = max_changed_words
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    resume_signature BLOB NOT NULL,
+                    jd_signature BLOB NOT NULL,
+                    resume_text BLOB NOT NULL,
+                    jd_text BLOB NOT NULL,
+                    result TEXT NOT NULL,
+                    usage TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (bucket TEXT NOT NULL, key TEXT NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets (bucket)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key)")
+
+    @staticmethod
+    def _key(resume_text, jd_text, context):
+        payload = json.dumps([" ".join(resume_text.split()), " ".join(jd_text.split()), context])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _delete(self, keys):
+        for key in keys:
+            self._conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+
+    def lookup(self, resume_text, jd_text, context):
+        """Return the Match of the most similar stored pair that passes the checks, or None."""
+        resume_signature, jd_signature = signature(resume_text), signature(jd_text)
+        buckets = _buckets(context, resume_signature, jd_signature)
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT key, resume_signature, jd_signature, resume_text, jd_text, result, usage, created_at "
+                "FROM analyses WHERE key IN (SELECT DISTINCT key FROM buckets WHERE bucket IN "
+                f"({','.join('?' * len(buckets))}) LIMIT ?)",
+                (*buckets, MAX_CANDIDATES),
+            ).fetchall()
+            best = None
+            rejected = False
+            for key, stored_resume, stored_jd, old_resume, old_jd, result, usage, created_at in rows:
+                if now - created_at > self.ttl_seconds:
+                    self._delete([key])
+                    continue
+                score = min(
+                    similarity(resume_signature, array("Q", stored_resume)),
+                    similarity(jd_signature, array("Q", stored_jd)),
+                )
+                if score < self.threshold or (best and score <= best[1]):
+                    continue
+                # Cheap delta check: similar shingles can still hide a changed skill or title
+                if self.max_changed_words >= 0 and (
+                    changed_words(zlib.decompress(old_resume).decode("utf-8"), resume_text) > self.max_changed_words
+                    or changed_words(zlib.decompress(old_jd).decode("utf-8"), jd_text) > self.max_changed_words
+                ):
+                    rejected = True
+                    continue
+                best = (key, score, result, usage)
+            if best is None:
+                outcome = "rejected" if rejected else "miss"
+                self._stats["rejected" if rejected else "misses"] += 1
+            else:
+                outcome = "hit"
+                self._stats["hits"] += 1
+                self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (now, best[0]))
+        metrics.REGISTRY.inc("neardup_lookups_total", outcome=outcome)
+        if best is None:
+            return None
+        metrics.REGISTRY.observe("neardup_hit_similarity", best[1])
+        return Match(best[2], json.loads(best[3]), best[1])
+
+    def add(self, resume_text, jd_text, context, result, usage=None):
+        """Store an analysis result text of the pair, evicting old entries if needed."""
+        resume_signature, jd_signature = signature(resume_text), signature(jd_text)
+        key = self._key(resume_text, jd_text, context)
+        now = time.time()
+        with self._lock, self._conn:
+            self._delete([key])
+            self._conn.execute(
+                "INSERT INTO analyses (key, resume_signature, jd_signature, resume_text, jd_text, result, usage, "
+                "created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, resume_signature.tobytes(), jd_signature.tobytes(),
+                    zlib.compress(resume_text.encode("utf-8")), zlib.compress(jd_text.encode("utf-8")),
+                    result, json.dumps(usage or {}), now, now,
+                ),
+            )
+            self._conn.executemany(
+                "INSERT INTO buckets (bucket, key) VALUES (?, ?)",
+                [(bucket, key) for bucket in _buckets(context, resume_signature, jd_signature)],
+            )
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT key FROM analyses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )]
+            count = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] - len(expired)
+            if count > self.max_entries:
+                expired += [row[0] for row in self._conn.execute(
+                    "SELECT key FROM analyses WHERE created_at >= ? ORDER BY last_used ASC LIMIT ?",
+                    (now - self.ttl_seconds, count - self.max_entries),
+                )]
+            self._delete(expired)
+
+    def stats(self):
+        """Return hit/miss/rejected counters and the number of stored analyses."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"] + stats["rejected"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def index_from_env():
+    """Build a NearDuplicateIndex from NEARDUP_* environment variables, or None if reuse is disabled."""
+    threshold = float(os.environ.get("NEARDUP_THRESHOLD", DEFAULT_THRESHOLD))
+    if threshold <= 0:
+        return None
+    return NearDuplicateIndex(
+        db_path=os.environ.get("NEARDUP_PATH", DEFAULT_DB_PATH),
+        threshold=threshold,
+        max_changed_words=int(os.environ.get("NEARDUP_MAX_CHANGED_WORDS", DEFAULT_MAX_CHANGED_WORDS)),
+        ttl_seconds=float(os.environ.get("NEARDUP_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        max_entries=int(os.environ.get("NEARDUP_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    )
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def shared():
+    """Return the process-wide index configured from the environment, or None if disabled."""
+    global _index, _index_loaded
+    with _index_lock:
+        if not _index_loaded:
+            _index = index_from_env()
+            _index_loaded = True
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the near-duplicate analysis index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    compare_parser = commands.add_parser("compare", help="Estimate the similarity of two documents")
+    compare_parser.add_argument("first")
+    compare_parser.add_argument("second")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        index = shared()
+        print(index.stats() if index else "Near-duplicate reuse is disabled (NEARDUP_THRESHOLD=0)")
+        return
+    import analysis  # Imported lazily: analysis imports this module
+    first, second = analysis.read_document(args.first), analysis.read_document(args.second)
+    print(f"Estimated similarity: {similarity(signature(first), signature(second)):.3f}")
+    print(f"Changed words (ignoring digits, emails and links): {changed_words(first, second)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Content-addressed cache for text extracted from uploaded PDFs."""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "pdf_text")
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+
+
+class TextCache:
+    """Two-tier (memory + disk) LRU cache mapping content hashes to text.
+
+    The memory tier is per process. The disk tier is a directory of
+    ``<key>.txt`` files shared by every process pointing at the same
+    directory; file modification times track recency so eviction survives
+    restarts.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=DEFAULT_MAX_DISK_BYTES,
+                 max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(data, namespace=""):
+        """Return the cache key for a blob of bytes."""
+        digest = hashlib.sha256(namespace.encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _remember(self, key, text):
+        size = len(text)
+        if size > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = text
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key):
+        """Return the cached text for ``key`` or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # Bump recency for LRU eviction
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, text)
+        return text
+
+    def put(self, key, text):
+        """Store ``text`` under ``key`` in both tiers."""
+        with self._lock:
+            self._remember(key, text)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort; the memory tier still holds the text
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until the disk tier fits its cap."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".txt"):
+                        continue
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((info.st_mtime, info.st_size, entry.path))
+                    total += info.st_size
+        except OSError:
+            return
+
+        if total <= self.max_disk_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats["evictions"] += 1
+
+    def get_or_compute(self, data, compute, namespace=""):
+        """Return cached text for ``data``, calling ``compute()`` on a miss.
+
+        ``compute`` may return None to signal failure; failures are not cached.
+        """
+        key = self.key_for(data, namespace)
+        text = self.get(key)
+        if text is None:
+            text = compute()
+            if text is not None:
+                self.put(key, text)
+        return text
+
+    def stats(self):
+        """Return hit/miss counters and the current size of each tier."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+def cache_from_env():
+    """Build a TextCache configured from PDF_CACHE_* environment variables."""
+    return TextCache(
+        cache_dir=os.environ.get("PDF_CACHE_DIR", DEFAULT_CACHE_DIR),
+        max_disk_bytes=int(os.environ.get("PDF_CACHE_MAX_BYTES", DEFAULT_MAX_DISK_BYTES)),
+        max_memory_bytes=int(os.environ.get("PDF_CACHE_MAX_MEMORY_BYTES", DEFAULT_MAX_MEMORY_BYTES)),
+    )
@@ -0,0 +1,145 @@
+"""Page-streaming PDF text extraction with a process pool for large documents."""
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from prompt_builder import estimate_tokens
+
+Page = namedtuple("Page", ["number", "text", "seconds"])
+
+
+class DocumentTooLarge(ValueError):
+    """Raised before parsing when a PDF exceeds the size or page cap."""
+
+
+# Below this many pages the cost of shipping the file to workers outweighs the gain
+PARALLEL_MIN_PAGES = 6
+PAGES_PER_TASK = 3
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def parser_version():
+    """Identify the extractor, so cached text is invalidated by upgrades."""
+    import PyPDF2
+    return f"PyPDF2-{PyPDF2.__version__}"
+
+
+def _worker_count():
+    return int(os.environ.get("PDF_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def _get_pool():
+    """Return the shared worker pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn avoids forking a multi-threaded server process
+            _pool = ProcessPoolExecutor(
+                max_workers=_worker_count(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _extract_range(data, start, stop):
+    """Extract pages ``start`` to ``stop`` (exclusive); runs in a worker process."""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    pages = []
+    for number in range(start, stop):
+        page_start = time.perf_counter()
+        text = reader.pages[number].extract_text() or ""
+        pages.append((number, text, time.perf_counter() - page_start))
+    return pages
+
+
+def _serial_pages(reader, start, stop):
+    for number in range(start, stop):
+        page_start = time.perf_counter()
+        text = reader.pages[number].extract_text() or ""
+        yield Page(number, text, time.perf_counter() - page_start)
+
+
+def _parallel_pages(data, start, stop):
+    pool = _get_pool()
+    futures = [
+        pool.submit(_extract_range, data, chunk_start, min(chunk_start + PAGES_PER_TASK, stop))
+        for chunk_start in range(start, stop, PAGES_PER_TASK)
+    ]
+    try:
+        # Yield in page order; later chunks keep extracting while earlier ones are consumed
+        for future in futures:
+            for number, text, seconds in future.result():
+                yield Page(number, text, seconds)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def iter_pages(data, max_pages=None, token_budget=None, parallel=True, max_bytes=None, max_document_pages=None):
+    """Yield ``Page(number, text, seconds)`` in page order.
+
+    Stops after ``max_pages`` pages, or once the extracted text reaches
+    ``token_budget`` estimated tokens. Documents with at least
+    PARALLEL_MIN_PAGES pages are extracted in a process pool. Raises
+    DocumentTooLarge, before any text is extracted, for files over
+    ``max_bytes`` or with more than ``max_document_pages`` pages.
+    """
+    if max_bytes and len(data) > max_bytes:
+        raise DocumentTooLarge(f"PDF is {len(data) / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.1f} MB")
+    import PyPDF2  # Imported lazily to keep app start-up fast
+    # BytesIO over bytes shares the buffer instead of copying it
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    if max_document_pages and total > max_document_pages:
+        raise DocumentTooLarge(f"PDF has {total} pages; the limit is {max_document_pages}")
+    if max_pages:
+        total = min(total, max_pages)
+
+    if parallel and total >= PARALLEL_MIN_PAGES and _worker_count() > 1:
+        pages = _parallel_pages(data, 0, total)
+    else:
+        pages = _serial_pages(reader, 0, total)
+
+    tokens = 0
+    next_page = 0
+    try:
+        for page in pages:
+            next_page = page.number + 1
+            yield page
+            tokens += estimate_tokens(page.text)
+            if token_budget and tokens >= token_budget:
+                return
+    except BrokenProcessPool:
+        # A crashed worker should not fail the upload; finish in-process
+        _reset_pool()
+        for page in _serial_pages(reader, next_page, total):
+            yield page
+            tokens += estimate_tokens(page.text)
+            if token_budget and tokens >= token_budget:
+                return
+    finally:
+        pages.close()
+
+
+def extract_text(data, max_pages=None, token_budget=None, parallel=True, max_bytes=None, max_document_pages=None):
+    """Return ``(text, pages)`` where ``pages`` holds per-page timings."""
+    pages = list(iter_pages(
+        data, max_pages=max_pages, token_budget=token_budget, parallel=parallel,
+        max_bytes=max_bytes, max_document_pages=max_document_pages
+    ))
+    return "\n".join(page.text for page in pages), pages
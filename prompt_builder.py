@@ -0,0 +1,267 @@
+"""Token-budget-aware packing of resume, JD and company text into a prompt.
+
+Instead of cutting each document at a fixed character count, documents are
+cleaned of PDF noise, split into sections, ranked by relevance to the other
+document and packed into a shared token budget. Kept sections stay in their
+original order.
+"""
+import difflib
+import math
+import os
+import re
+from collections import namedtuple
+
+from tokenizer import tokenize
+
+DEFAULT_TOKEN_BUDGET = 4000
+
+# Share of the budget each document gets before unused space is redistributed
+BUDGET_SHARES = {"jd": 0.4, "resume": 0.5, "about": 0.1}
+
+# Rough average for English text with Llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+MAX_SECTION_LINES = 8
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?;])\s+')
+
+PAGE_NOISE_RE = re.compile(r'^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|\d{1,3})$', re.IGNORECASE)
+BOILERPLATE_RE = re.compile(
+    r'equal opportunity|all rights reserved|privacy policy|cookie|terms of use|'
+    r'reasonable accommodation|without regard to|affirmative action|e-?verify',
+    re.IGNORECASE
+)
+HEADING_RE = re.compile(r'^([A-Z][A-Za-z/&,\- ]{1,40}:?|[A-Z0-9/&,\- ]{3,40})$')
+PRIORITY_HEADINGS = re.compile(
+    r'require|qualif|responsib|skill|experience|must|duties|summary|profile|project|education',
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate; good enough for budgeting."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clean_document(text):
+    """Normalize whitespace and strip page numbers, repeated headers/footers and boilerplate."""
+    lines = [re.sub(r'\s+', ' ', line).strip() for line in text.splitlines()]
+
+    counts = {}
+    for line in lines:
+        if line:
+            key = line.lower()
+            counts[key] = counts.get(key, 0) + 1
+
+    cleaned = []
+    seen_repeated = set()
+    for line in lines:
+        if not line:
+            if cleaned and cleaned[-1]:
+                cleaned.append("")
+            continue
+        key = line.lower()
+        if PAGE_NOISE_RE.match(line) or not re.search(r'[A-Za-z0-9]', line):
+            continue
+        if BOILERPLATE_RE.search(line):
+            continue
+        # Lines repeated on every page are headers/footers; keep the first one
+        if counts[key] >= 3 and len(line) < 80:
+            if key in seen_repeated:
+                continue
+            seen_repeated.add(key)
+        if cleaned and cleaned[-1] == line:
+            continue
+        cleaned.append(line)
+
+    return "\n".join(cleaned).strip()
+
+
+def split_sections(text):
+    """Split cleaned text into sections at blank lines and heading-like lines."""
+    sections = []
+    current = []
+
+    def flush():
+        if current:
+            sections.append("\n".join(current))
+            current.clear()
+
+    for line in text.splitlines():
+        if not line:
+            flush()
+            continue
+        if current and HEADING_RE.match(line):
+            flush()
+        current.append(line)
+        if len(current) >= MAX_SECTION_LINES:
+            flush()
+    flush()
+    return sections
+
+
+SectionDiff = namedtuple("SectionDiff", ["removed", "added", "unchanged", "changed_tokens", "total_tokens"])
+
+
+def diff_sections(old_text, new_text):
+    """Compare two versions of a document section by section.
+
+    Returns a SectionDiff with the removed and added (edited sections count
+    as both) section texts, the number of unchanged sections, and token
+    estimates of the change and of the new document.
+    """
+    old_sections = split_sections(clean_document(old_text or ""))
+    new_sections = split_sections(clean_document(new_text or ""))
+    removed, added, unchanged = [], [], 0
+    matcher = difflib.SequenceMatcher(None, old_sections, new_sections, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            unchanged += i2 - i1
+        else:
+            removed.extend(old_sections[i1:i2])
+            added.extend(new_sections[j1:j2])
+    changed_tokens = sum(estimate_tokens(section) for section in removed + added)
+    total_tokens = sum(estimate_tokens(section) for section in new_sections)
+    return SectionDiff(removed, added, unchanged, changed_tokens, total_tokens)
+
+
+def rank_sections(sections, reference_text):
+    """Return section indices ordered from most to least relevant."""
+    reference_terms = set(tokenize(reference_text))
+    scores = []
+    for index, section in enumerate(sections):
+        terms = set(tokenize(section))
+        overlap = len(terms & reference_terms) / math.sqrt(len(terms)) if terms else 0.0
+        first_line = section.split("\n", 1)[0]
+        if PRIORITY_HEADINGS.search(first_line):
+            overlap += 1.0
+        if index == 0:
+            overlap += 2.0  # Title / contact block anchors the document
+        scores.append(overlap)
+    return sorted(range(len(sections)), key=lambda i: (-scores[i], i))
+
+
+def pack_sections(text, budget_tokens, reference_text=""):
+    """Pack the most relevant sections of ``text`` into ``budget_tokens``."""
+    sections = split_sections(text)
+    chosen = {}
+    remaining = budget_tokens
+    for index in rank_sections(sections, reference_text):
+        if remaining <= 0:
+            break
+        section = sections[index]
+        cost = estimate_tokens(section) + 1
+        if cost <= remaining:
+            chosen[index] = section
+            remaining -= cost
+        elif remaining >= 32:
+            # Keep the head of an oversized section rather than nothing
+            lines = []
+            for line in section.splitlines():
+                if estimate_tokens("\n".join(lines + [line])) + 1 > remaining:
+                    break
+                lines.append(line)
+            if not lines:
+                # A single very long line (common in scraped text): cut at a word boundary
+                head = section[:(remaining - 1) * CHARS_PER_TOKEN]
+                lines = [head.rsplit(" ", 1)[0] if " " in head else head]
+            if lines[0]:
+                chosen[index] = "\n".join(lines)
+                remaining -= estimate_tokens(chosen[index]) + 1
+    return "\n".join(chosen[index] for index in sorted(chosen))
+
+
+def _split_line(line, max_tokens):
+    """Split a line longer than ``max_tokens`` at sentence ends, then between words, then anywhere."""
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    pieces = []
+    current = ""
+    for sentence in SENTENCE_END_RE.split(line):
+        parts = [sentence] if len(sentence) <= max_chars else sentence.split()
+        for part in parts:
+            for start in range(0, len(part), max_chars):
+                fragment = part[start:start + max_chars]
+                if current and len(current) + 1 + len(fragment) > max_chars:
+                    pieces.append(current)
+                    current = ""
+                current = f"{current} {fragment}" if current else fragment
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_document(text, chunk_tokens):
+    """Split cleaned text into chunks of whole sections of at most ``chunk_tokens`` each, in order.
+
+    A section larger than a chunk is split between lines, and a line larger
+    than a chunk (a JD pasted without line breaks) between sentences or words.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for section in split_sections(text):
+        pieces = [section]
+        if estimate_tokens(section) + 1 > chunk_tokens:
+            pieces = []
+            for line in section.splitlines():
+                if estimate_tokens(line) + 1 > chunk_tokens:
+                    pieces.extend(_split_line(line, chunk_tokens - 1))
+                else:
+                    pieces.append(line)
+        for piece in pieces:
+            cost = estimate_tokens(piece) + 1
+            if current and current_tokens + cost > chunk_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def allocate_budget(needs, budget_tokens, shares=BUDGET_SHARES):
+    """Split the budget by share, handing any unused space to documents that need it."""
+    allocation = {name: 0 for name in needs}
+    pending = {name for name, need in needs.items() if need > 0}
+    remaining = budget_tokens
+    while pending and remaining > 0:
+        total_share = sum(shares[name] for name in pending)
+        offers = {name: remaining * shares[name] / total_share for name in pending}
+        satisfied = {name for name in pending if needs[name] - allocation[name] <= offers[name]}
+        if not satisfied:
+            for name in pending:
+                allocation[name] += int(offers[name])
+            break
+        for name in satisfied:
+            remaining -= needs[name] - allocation[name]
+            allocation[name] = needs[name]
+        pending -= satisfied
+    return allocation
+
+
+def fit_to_budget(jd_text, resume_text, about_text="", budget_tokens=None):
+    """Return cleaned ``(jd, resume, about)`` texts that fit the token budget together."""
+    if budget_tokens is None:
+        budget_tokens = int(os.environ.get("PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+    documents = {
+        "jd": clean_document(jd_text or ""),
+        "resume": clean_document(resume_text or ""),
+        "about": clean_document(about_text or ""),
+    }
+    needs = {name: estimate_tokens(text) for name, text in documents.items()}
+    allocation = allocate_budget(needs, budget_tokens)
+
+    references = {
+        "jd": documents["resume"],
+        "resume": documents["jd"],
+        "about": documents["jd"],
+    }
+    packed = {}
+    for name, text in documents.items():
+        if needs[name] <= allocation[name]:
+            packed[name] = text
+        else:
+            packed[name] = pack_sections(text, allocation[name], references[name])
+    return packed["jd"], packed["resume"], packed["about"]
@@ -0,0 +1,249 @@
+"""Process-wide rate limiting, retries and a circuit breaker for Groq calls.
+
+Every Groq request goes through ``call``: it waits for the shared token
+buckets (requests and tokens per minute), retries rate limits and
+upstream failures with jittered exponential backoff (honoring
+Retry-After), and fails fast while the circuit breaker is open after
+repeated upstream failures. Near the quota ceiling requests queue in the
+limiter instead of turning into a storm of 429s.
+
+    GROQ_RPM                  Requests per minute (default 0: unlimited)
+    GROQ_TPM                  Tokens per minute, prompt + max_tokens (default 0: unlimited)
+    GROQ_MAX_ATTEMPTS         Attempts per request, including the first (default 4)
+    GROQ_BACKOFF_BASE         First backoff ceiling in seconds (default 1)
+    GROQ_BACKOFF_MAX          Backoff ceiling in seconds (default 30)
+    GROQ_BREAKER_FAILURES     Consecutive upstream failures that open the circuit (default 5)
+    GROQ_BREAKER_RESET        Seconds the circuit stays open before a trial request (default 30)
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+
+import metrics
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+# HTTP statuses worth retrying besides 429
+RETRYABLE_STATUSES = {408, 409, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Groq while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, holding at most a minute's worth."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take ``amount`` units now, returning the seconds to wait until they are covered.
+
+        The level may go negative, so concurrent callers queue up behind
+        each other instead of all waking at the same moment.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, amount):
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+
+class RateLimiter:
+    """Request and token buckets shared by every caller; 0 disables a limit."""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        """Block until a request of ``tokens`` tokens may be sent; returns the seconds waited."""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            metrics.REGISTRY.observe("groq_rate_limit_wait_seconds", wait)
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def refund(self, tokens):
+        """Return tokens reserved for a request that used fewer."""
+        if self.tokens and tokens > 0:
+            self.tokens.refund(tokens)
+
+    def pause(self, seconds):
+        """Hold every caller back for ``seconds``, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures; lets one trial through after a cooldown."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_FAILURES, reset_seconds=DEFAULT_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.REGISTRY.set_gauge("groq_circuit_open", int(state != self.CLOSED))
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_seconds - time.monotonic()
+                if remaining > 0:
+                    metrics.REGISTRY.inc("groq_circuit_rejections_total")
+                    raise CircuitOpenError(
+                        f"Groq looks unavailable after repeated failures; retrying in {remaining:.0f}s"
+                    )
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    metrics.REGISTRY.inc("groq_circuit_rejections_total")
+                    raise CircuitOpenError("Groq looks unavailable; a trial request is in progress")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+def _status(error):
+    return getattr(error, "status_code", None)
+
+
+def classify(error):
+    """Return "rate_limit", "upstream" (retryable, counts against the breaker) or "client"."""
+    status = _status(error)
+    if status == 429:
+        return "rate_limit"
+    if status in RETRYABLE_STATUSES:
+        return "upstream"
+    if status is None:
+        from groq import APIConnectionError  # Imported lazily like the client itself
+        if isinstance(error, (APIConnectionError, TimeoutError, ConnectionError)):
+            return "upstream"
+    return "client"
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, from Retry-After(-Ms) headers, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff for the given (1-based) attempt."""
+    base = float(os.environ.get("GROQ_BACKOFF_BASE", DEFAULT_BACKOFF_BASE))
+    ceiling = float(os.environ.get("GROQ_BACKOFF_MAX", DEFAULT_BACKOFF_MAX))
+    return random.uniform(0, min(ceiling, base * 2 ** (attempt - 1)))
+
+
+_limiter = None
+_breaker = None
+_init_lock = threading.Lock()
+
+
+def shared():
+    """Return the process-wide ``(limiter, breaker)``, configured from the environment on first use."""
+    global _limiter, _breaker
+    with _init_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(int(os.environ.get("GROQ_RPM", 0)), int(os.environ.get("GROQ_TPM", 0)))
+            _breaker = CircuitBreaker(
+                int(os.environ.get("GROQ_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+                float(os.environ.get("GROQ_BREAKER_RESET", DEFAULT_BREAKER_RESET)),
+            )
+        return _limiter, _breaker
+
+
+def call(request, tokens=0, limiter=None, breaker=None):
+    """Send ``request()`` through the limiter, breaker and retry loop.
+
+    ``tokens`` is the request's estimated token cost (prompt + max_tokens);
+    the unused part is refunded when the response reports its usage.
+    Raises CircuitOpenError, or the last error once retries are exhausted.
+    """
+    if limiter is None or breaker is None:
+        limiter, breaker = shared()
+    attempts = max(1, int(os.environ.get("GROQ_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)))
+    for attempt in range(1, attempts + 1):
+        breaker.before_call()
+        limiter.acquire(tokens)
+        try:
+            response = request()
+        except Exception as e:
+            kind = classify(e)
+            if kind == "upstream":
+                breaker.record_failure()
+            else:
+                # The upstream answered, so it is up
+                breaker.record_success()
+            if kind == "client" or attempt == attempts:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = backoff(attempt)
+            if kind == "rate_limit":
+                limiter.pause(delay)
+            metrics.REGISTRY.inc("groq_retries_total", reason=kind)
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        used = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if used is not None:
+            limiter.refund(tokens - used)
+        return response
@@ -0,0 +1,151 @@
+"""Model routing by analysis depth, and hedged Groq requests.
+
+``choose_route`` maps the depth slider and the include_* options to a
+model, a completion token limit and the prompt sections to ask for, so a
+Basic score goes to a small, fast model with a short answer.
+
+``hedged`` runs a request and, if it has not finished once the recent
+latency of like requests (same model and completion limit) passes a
+percentile, starts one backup request and uses
+whichever finishes first. The slower call is not cancelled (the HTTP
+request is already in flight), so hedging trades a few extra calls in
+the latency tail for a shorter p95/p99.
+
+    GROQ_MODEL_BASIC / GROQ_MODEL_STANDARD / GROQ_MODEL_DETAILED   Model per depth
+    GROQ_HEDGE_PERCENTILE    Latency percentile that triggers the backup (default 90)
+    GROQ_HEDGE_MIN_SAMPLES   Calls observed before hedging starts (default 10)
+"""
+import math
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import analysis_result
+import metrics
+
+Route = namedtuple("Route", ["depth", "model", "max_tokens", "sections", "max_items"])
+
+# depth -> (default model, completion token limit, items per section)
+DEPTHS = {
+    "Basic": ("llama3-8b-8192", 800, 3),
+    "Standard": ("llama3-70b-8192", 2000, 5),
+    "Detailed": ("llama3-70b-8192", 4000, None),
+}
+
+# Basic asks only for what a quick score needs
+BASIC_SECTIONS = ("missing_keywords", "action_items")
+
+# Sections dropped when the matching include_* option is off
+OPTIONAL_SECTIONS = {
+    "keywords": ("missing_keywords", "overused_terms"),
+    "skills": ("skills_gaps",),
+    "formatting": ("content_improvements",),
+}
+
+DEFAULT_HEDGE_PERCENTILE = 90
+DEFAULT_HEDGE_MIN_SAMPLES = 10
+LATENCY_WINDOW = 200
+HEDGE_WORKERS = 32
+
+
+def choose_route(depth="Standard", include_keywords=True, include_skills=True, include_formatting=True):
+    """Return the Route for an analysis depth and the selected sections."""
+    default_model, max_tokens, max_items = DEPTHS.get(depth, DEPTHS["Standard"])
+    model = os.environ.get(f"GROQ_MODEL_{depth.upper()}", default_model)
+    sections = BASIC_SECTIONS if depth == "Basic" else analysis_result.SECTION_KEYS
+    excluded = set()
+    for name, included in (("keywords", include_keywords), ("skills", include_skills),
+                           ("formatting", include_formatting)):
+        if not included:
+            excluded.update(OPTIONAL_SECTIONS[name])
+    sections = tuple(key for key in sections if key not in excluded)
+    return Route(depth, model, max_tokens, sections, max_items)
+
+
+def latency_key(route):
+    """Group requests by model and completion limit: short answers would pull a full analysis's percentile down."""
+    return route.model, route.max_tokens
+
+
+class LatencyTracker:
+    """Recent request latencies per key (see latency_key), for picking the hedge delay."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, pct):
+        """Nearest-rank percentile of recent latencies, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        return samples[max(1, math.ceil(pct / 100 * len(samples))) - 1]
+
+    def hedge_delay(self, key):
+        """Seconds to wait before hedging, or None until enough calls were observed."""
+        with self._lock:
+            count = len(self._samples.get(key, ()))
+        if count < int(os.environ.get("GROQ_HEDGE_MIN_SAMPLES", DEFAULT_HEDGE_MIN_SAMPLES)):
+            return None
+        return self.percentile(key, float(os.environ.get("GROQ_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)))
+
+
+LATENCY = LatencyTracker()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="groq-hedge")
+        return _executor
+
+
+def timed(key, call, tracker=LATENCY):
+    """Run ``call()`` and record its latency under ``key`` (see latency_key)."""
+    start = time.perf_counter()
+    result = call()
+    tracker.observe(key, time.perf_counter() - start)
+    return result
+
+
+def hedged(key, call, tracker=LATENCY):
+    """Run ``call()``, starting one backup call if it is slower than usual.
+
+    Returns the first successful result; raises the primary's error only if
+    both calls fail. Without enough latency samples this is a plain call.
+    """
+    delay = tracker.hedge_delay(key)
+    if delay is None:
+        return timed(key, call, tracker)
+
+    executor = _get_executor()
+    primary = executor.submit(timed, key, call, tracker)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    backup = executor.submit(timed, key, call, tracker)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                metrics.REGISTRY.inc("groq_hedges_total", winner="primary" if future is primary else "backup")
+                return future.result()
+            if future is primary or error is None:
+                error = future.exception()
+    metrics.REGISTRY.inc("groq_hedges_total", winner="none")
+    raise error
@@ -0,0 +1,193 @@
+"""Company website scraping with pooled connections and an HTTP cache."""
+import importlib.util
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+TIMEOUT = 10
+HOMEPAGE_MAX_BYTES = 512 * 1024
+SUBPAGE_MAX_BYTES = 256 * 1024
+ABOUT_TEXT_CHARS = 1000
+
+# Candidate pages in order of preference for the "about" text
+CANDIDATE_PAGES = ("about", "company", "careers")
+
+# lxml is several times faster than the pure-Python parser when installed
+PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+_HOMEPAGE_TAGS = SoupStrainer(["title", "meta", "a"])
+
+
+class HTTPCache:
+    """Small in-memory LRU of response bodies with their validators.
+
+    Stale entries are revalidated with If-None-Match / If-Modified-Since so
+    an unchanged page costs a 304 instead of a full download.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0}
+
+    def lookup(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def store(self, url, body, headers):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        max_age = _max_age(headers.get("Cache-Control", ""))
+        if not (etag or last_modified or max_age):
+            return
+        with self._lock:
+            self._entries[url] = {
+                "body": body,
+                "etag": etag,
+                "last_modified": last_modified,
+                "expires_at": time.time() + (max_age or 0),
+            }
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def _max_age(cache_control):
+    """Return the max-age in seconds from a Cache-Control header, if cacheable."""
+    directives = [part.strip().lower() for part in cache_control.split(",")]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return int(directive.split("=", 1)[1])
+            except ValueError:
+                return 0
+    return 0
+
+
+def _make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+session = _make_session()
+http_cache = HTTPCache()
+
+
+def fetch(url, max_bytes, timeout=TIMEOUT):
+    """Return up to ``max_bytes`` of the body at ``url``, using the HTTP cache."""
+    entry = http_cache.lookup(url)
+    headers = {}
+    if entry is not None:
+        if entry["expires_at"] > time.time():
+            http_cache.count("fresh_hits")
+            return entry["body"]
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304 and entry is not None:
+            http_cache.count("revalidated")
+            http_cache.store(url, entry["body"], response.headers)
+            return entry["body"]
+
+        # Stop reading once we have enough; the rest of the page is never used
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= max_bytes:
+                break
+        body = b"".join(chunks)[:max_bytes]
+
+        http_cache.count("misses")
+        if response.ok:
+            http_cache.store(url, body, response.headers)
+        return body
+
+
+def find_candidate_links(soup, base_url):
+    """Map each candidate page keyword to the first link mentioning it."""
+    links = {}
+    for link in soup.find_all('a', href=True):
+        href = link['href'].lower()
+        for keyword in CANDIDATE_PAGES:
+            if keyword not in links and keyword in href:
+                links[keyword] = urljoin(base_url, link['href'])
+        if len(links) == len(CANDIDATE_PAGES):
+            break
+    return links
+
+
+def _page_text(url):
+    body = fetch(url, SUBPAGE_MAX_BYTES)
+    return BeautifulSoup(body, PARSER).get_text(" ")
+
+
+def scrape_company(url):
+    """Scrape basic company information from its website.
+
+    Raises on failure to fetch the homepage. Candidate pages (about,
+    company, careers) are fetched concurrently; failures there only
+    affect the ``about`` text.
+    """
+    soup = BeautifulSoup(fetch(url, HOMEPAGE_MAX_BYTES), PARSER, parse_only=_HOMEPAGE_TAGS)
+
+    # Extract basic company info
+    title = soup.find('title')
+    company_name = title.get_text() if title else urlparse(url).netloc
+    description = soup.find('meta', attrs={'name': 'description'})
+    description = description.get('content') if description else None
+    description = description or "No description found"
+
+    # Fetch candidate pages in parallel and keep the most relevant one
+    links = find_candidate_links(soup, url)
+    about_text = ""
+    if links:
+        with ThreadPoolExecutor(max_workers=len(links)) as executor:
+            futures = {keyword: executor.submit(_page_text, link) for keyword, link in links.items()}
+        for keyword in CANDIDATE_PAGES:
+            future = futures.get(keyword)
+            if future is None:
+                continue
+            try:
+                text = " ".join(future.result().split())
+            except Exception:
+                continue
+            if text:
+                about_text = text[:ABOUT_TEXT_CHARS] + "..."  # Limit text length
+                break
+        else:
+            about_text = "Could not retrieve additional details"
+
+    return {
+        "name": company_name,
+        "description": description,
+        "about": about_text,
+        "website": url,
+    }
@@ -0,0 +1,133 @@
+"""Process-wide store for per-session artifacts under a memory budget.
+
+Analysis views and resume versions used to live in each session's state,
+so memory grew with the number of open sessions. Sessions now keep only
+keys; the artifacts live here, sized on insert and evicted least recently
+used first once the store exceeds its budget. An evicted view is simply
+analyzed again (usually from the response cache) on the next submit.
+
+    SESSION_STORE_MAX_MB   Memory budget for all sessions' artifacts (default 64)
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_MB = 64
+
+
+def deep_size(value, _seen=None):
+    """Approximate bytes held by ``value`` and the containers and strings it references."""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
+
+
+class ArtifactStore:
+    """LRU map of ``(session, key)`` to artifacts, bounded by ``max_bytes`` in total."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def put(self, session, key, value):
+        """Store an artifact, evicting the least recently used ones to stay in budget."""
+        size = deep_size(value)
+        with self._lock:
+            old = self._items.pop((session, key), None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[(session, key)] = (value, size)
+            self._bytes += size
+            # Never evict the entry just stored, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def get(self, session, key):
+        """Return the artifact, or None if it was never stored or has been evicted."""
+        with self._lock:
+            item = self._items.get((session, key))
+            if item is None:
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end((session, key))
+            self._stats["hits"] += 1
+            return item[0]
+
+    def discard(self, session, key):
+        with self._lock:
+            item = self._items.pop((session, key), None)
+            if item is not None:
+                self._bytes -= item[1]
+
+    def resize(self, session, key):
+        """Re-measure an artifact that was changed in place."""
+        with self._lock:
+            item = self._items.get((session, key))
+        if item is not None:
+            self.put(session, key, item[0])
+
+    def stats(self):
+        """Return entry, session and byte counts with hit/miss/eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._items)
+            stats["sessions"] = len({session for session, _ in self._items})
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def store_from_env():
+    """Build an ArtifactStore sized by SESSION_STORE_MAX_MB."""
+    return ArtifactStore(int(float(os.environ.get("SESSION_STORE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024))
+
+
+def rss_bytes():
+    """Return ``(current, peak)`` resident set size of this process in bytes; either may be None."""
+    current = peak = None
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        peak = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    return current, peak
+
+
+def memory_report(store, pdf_cache_stats=None):
+    """Summarize process memory and what the bounded stores hold, as a flat dict of byte counts."""
+    current, peak = rss_bytes()
+    store_stats = store.stats()
+    report = {
+        "rss_bytes": current,
+        "peak_rss_bytes": peak,
+        "session_store_bytes": store_stats["bytes"],
+        "session_store_max_bytes": store_stats["max_bytes"],
+        "session_store_entries": store_stats["entries"],
+        "session_store_sessions": store_stats["sessions"],
+        "session_store_evictions": store_stats["evictions"],
+    }
+    if pdf_cache_stats is not None:
+        report["pdf_cache_memory_bytes"] = pdf_cache_stats.get("memory_bytes")
+    return report
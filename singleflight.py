@@ -0,0 +1,109 @@
+"""Coalesce identical in-flight calls within the process.
+
+When several sessions ask for the same analysis (or scrape the same
+company site) at the same time, the first caller runs it and the others
+wait for its result instead of paying for their own call. Each waiter
+has its own timeout; an error raised by the call is raised in every
+waiter.
+
+    SINGLEFLIGHT_TIMEOUT   Seconds a waiter waits for the shared call (default 180)
+"""
+import os
+import threading
+
+import metrics
+
+DEFAULT_TIMEOUT = 180
+
+
+class Call:
+    """One in-flight call that followers can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self, timeout=None):
+        """Return the call's result, re-raise its error, or raise TimeoutError."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout:.0f}s waiting for an identical request")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Per-key registry of in-flight calls.
+
+    ``do`` covers plain calls; ``begin``/``finish`` let a generator such as
+    a streamed response lead a call and publish its result when done.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0, "timeouts": 0}
+
+    def begin(self, key):
+        """Return ``(call, leader)``; only the leader runs the work and must call ``finish``."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                metrics.REGISTRY.inc("singleflight_coalesced_total", flight=self.name)
+                return call, False
+            call = self._calls[key] = Call()
+            self._stats["calls"] += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's result (or error) to every waiter."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call._done.set()
+
+    def wait(self, call, timeout=None):
+        """Wait as a follower; see ``Call.wait``."""
+        if timeout is None:
+            timeout = float(os.environ.get("SINGLEFLIGHT_TIMEOUT", DEFAULT_TIMEOUT))
+        try:
+            return call.wait(timeout)
+        except TimeoutError:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise
+
+    def do(self, key, fn, timeout=None):
+        """Run ``fn()`` once for concurrent callers with the same key.
+
+        Returns ``(result, shared)``, where ``shared`` is True for callers
+        that received another caller's result.
+        """
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call, timeout), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+
+    def stats(self):
+        """Return leader calls, coalesced waiters and waiter timeouts so far."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+ANALYSES = SingleFlight("analysis")
+COMPANIES = SingleFlight("company")
@@ -0,0 +1,263 @@
+"""Local skill and keyword extraction with an Aho-Corasick automaton.
+
+    python skills.py resume.pdf job.pdf     # missing, matched and overused terms
+
+Every alias in the taxonomy (skills_taxonomy.txt, or SKILLS_TAXONOMY_PATH)
+is compiled into one automaton, so a document is scanned in a single pass
+regardless of how many terms the taxonomy holds. Comparing the resume's
+and the JD's term counts gives the missing, matched and overused terms
+shown in the keyword cards; the model only receives them as a short hint.
+
+    SKILLS_TAXONOMY_PATH   Taxonomy file (default skills_taxonomy.txt next to this module)
+"""
+import argparse
+import os
+import re
+import threading
+from collections import Counter, deque, namedtuple
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.txt")
+
+# Category whose terms count as overused once repeated
+BUZZWORDS = "buzzwords"
+BUZZWORD_MIN_COUNT = 2
+# A skill is overused when the resume repeats it this often and far more than the JD does
+OVERUSED_MIN_COUNT = 4
+OVERUSED_RATIO = 3
+# Case-sensitive and one-letter patterns (Go, C, R) do not match inside "R&D", "C-level" or "and/or"
+JOINERS = "&-/"
+# Text allowed between a one-letter term and a neighbouring term of its category ("C, Java or R")
+LIST_GAP_RE = re.compile(r'\s*(?:[,;]\s*)?(?:(?:and|or)\s+)?')
+
+Term = namedtuple("Term", ["name", "category"])
+SkillReport = namedtuple("SkillReport", ["missing", "matched", "overused", "resume_counts", "jd_counts"])
+SkillReport.__doc__ = """Keyword comparison of a resume and a JD.
+
+``missing`` and ``matched`` hold JD terms (most mentioned first) absent from
+or present in the resume; ``overused`` holds resume terms repeated too
+often. The counts map term names to occurrences in each document.
+"""
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over every pattern of a taxonomy."""
+
+    def __init__(self, entries):
+        """``entries`` are ``(name, category, patterns)``; a pattern starting with "=" is case-sensitive."""
+        self.terms = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        # pattern index -> (term index, pattern length, exact text or None, strict boundaries)
+        self._patterns = []
+        for name, category, patterns in entries:
+            term_index = len(self.terms)
+            self.terms.append(Term(name, category))
+            for pattern in patterns:
+                exact = pattern[1:] if pattern.startswith("=") else None
+                pattern = " ".join((exact or pattern).split())
+                if pattern:
+                    strict = exact is not None or len(pattern) == 1
+                    self._add(pattern.lower(), (term_index, len(pattern), exact, strict))
+        self._build()
+
+    def _add(self, pattern, info):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(len(self._patterns))
+        self._patterns.append(info)
+
+    def _build(self):
+        # Breadth-first, so every failure link points at an already finished state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find(self, text):
+        """Return ``(start, end, term index)`` for every whole-word match, longest first where they overlap.
+
+        A one-letter term only counts in a list: next to a comma or to
+        another term of its category ("C, C++", "Python or R").
+        """
+        text = re.sub(r'\s+', ' ', text)
+        lowered = text.lower()
+        # Case-sensitive patterns are checked against the original text only if lowering kept offsets
+        aligned = len(lowered) == len(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for end, char in enumerate(lowered, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_index in out[state]:
+                term_index, length, exact, strict = self._patterns[pattern_index]
+                start = end - length
+                before = lowered[start - 1] if start > 0 else " "
+                after = lowered[end] if end < len(lowered) else " "
+                if before.isalnum() or after.isalnum():
+                    continue
+                if strict and (before in JOINERS or after in JOINERS):
+                    continue
+                if exact is not None and aligned and text[start:end] != exact:
+                    continue
+                matches.append((start, end, term_index))
+
+        # Keep the leftmost-longest match where patterns overlap ("machine learning" over "learning")
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        kept = []
+        covered_until = 0
+        for start, end, term_index in matches:
+            if start >= covered_until:
+                kept.append((start, end, term_index))
+                covered_until = end
+        return [match for i, match in enumerate(kept) if match[1] - match[0] > 1 or self._listed(lowered, kept, i)]
+
+    def _listed(self, text, matches, i):
+        start, end, term_index = matches[i]
+        if text[:start].rstrip().endswith((",", ";")) or text[end:].lstrip().startswith((",", ";")):
+            return True
+        category = self.terms[term_index].category
+        neighbours = []
+        if i > 0:
+            neighbours.append((matches[i - 1], matches[i - 1][1], start))
+        if i + 1 < len(matches):
+            neighbours.append((matches[i + 1], end, matches[i + 1][0]))
+        return any(
+            self.terms[other].category == category and other_end - other_start > 1
+            and LIST_GAP_RE.fullmatch(text, gap_start, gap_end)
+            for (other_start, other_end, other), gap_start, gap_end in neighbours
+        )
+
+    def count(self, text):
+        """Return a Counter of term names found in ``text``."""
+        return Counter(self.terms[term_index].name for _, _, term_index in self.find(text))
+
+
+def load_taxonomy(path):
+    """Read ``(name, category, patterns)`` entries from a taxonomy file."""
+    entries = []
+    category = ""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                category = line[1:-1].strip().lower()
+                continue
+            patterns = [pattern.strip() for pattern in line.split("|") if pattern.strip()]
+            entries.append((patterns[0].lstrip("="), category, patterns))
+    return entries
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def default_matcher():
+    """Return the matcher for SKILLS_TAXONOMY_PATH, compiled once per process."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = SkillMatcher(load_taxonomy(os.environ.get("SKILLS_TAXONOMY_PATH", DEFAULT_TAXONOMY_PATH)))
+        return _matcher
+
+
+def compare(resume_text, jd_text, matcher=None):
+    """Scan both documents once and return their SkillReport."""
+    matcher = matcher or default_matcher()
+    resume_counts = matcher.count(resume_text)
+    jd_counts = matcher.count(jd_text)
+    categories = {term.name: term.category for term in matcher.terms}
+
+    jd_terms = sorted(
+        (name for name in jd_counts if categories[name] != BUZZWORDS), key=lambda name: (-jd_counts[name], name)
+    )
+    overused = []
+    for name, count in resume_counts.most_common():
+        if categories[name] == BUZZWORDS:
+            if count >= BUZZWORD_MIN_COUNT:
+                overused.append(name)
+        elif count >= OVERUSED_MIN_COUNT and count >= OVERUSED_RATIO * max(jd_counts[name], 1):
+            overused.append(name)
+    return SkillReport(
+        missing=[name for name in jd_terms if not resume_counts[name]],
+        matched=[name for name in jd_terms if resume_counts[name]],
+        overused=overused,
+        resume_counts=dict(resume_counts),
+        jd_counts=dict(jd_counts),
+    )
+
+
+def _times(count):
+    return "once" if count == 1 else f"{count} times"
+
+
+def keyword_items(report, limit=3):
+    """Return ``(missing, overused)`` lists of ``(term, detail)`` pairs for the keyword cards."""
+    missing = [
+        (name, f"mentioned {_times(report.jd_counts[name])} in the job description, not in your resume")
+        for name in report.missing[:limit]
+    ]
+    overused = [
+        (name, f"{_times(report.resume_counts[name])} in your resume"
+               + (f" vs {_times(report.jd_counts[name])} in the job description" if report.jd_counts.get(name) else ""))
+        for name in report.overused[:limit]
+    ]
+    return missing, overused
+
+
+def coverage(report):
+    """One-line summary of how many JD terms the resume covers."""
+    total = len(report.missing) + len(report.matched)
+    if not total:
+        return "No known skills were found in the job description."
+    return f"Your resume covers {len(report.matched)} of the {total} skills the job description names."
+
+
+def hint_text(report, limit=10):
+    """Compact summary of the scan for the prompt."""
+    def listing(names, counts):
+        return ", ".join(f"{name} ({counts[name]})" for name in names[:limit]) or "none"
+
+    return (
+        "Local keyword scan (already shown to the user; use it, do not repeat it): "
+        f"missing from resume: {listing(report.missing, report.jd_counts)}; "
+        f"matched: {listing(report.matched, report.jd_counts)}; "
+        f"overused in resume: {listing(report.overused, report.resume_counts)}."
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the skills named in a resume and a job description.")
+    parser.add_argument("resume", help="Resume PDF or text file")
+    parser.add_argument("jd", help="Job description PDF or text file")
+    args = parser.parse_args(argv)
+
+    import analysis  # Imported lazily: analysis imports this module
+    report = compare(analysis.read_document(args.resume), analysis.read_document(args.jd))
+    print(coverage(report))
+    for label, names, counts in (("Missing", report.missing, report.jd_counts),
+                                 ("Matched", report.matched, report.jd_counts),
+                                 ("Overused", report.overused, report.resume_counts)):
+        print(f"{label}: " + (", ".join(f"{name} ({counts[name]})" for name in names) or "-"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import analysis
+import analysis_result
+import batch_cli
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """Run batch_cli.main on one resume and two jobs with a stubbed analysis; returns the output path."""
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setenv("PDF_CACHE_DIR", str(tmp_path / "pdf_cache"))
+    monkeypatch.setattr(analysis, "create_groq_client", lambda api_key: None)
+    monkeypatch.setattr(
+        analysis, "analyze_pair",
+        lambda jd_text, resume_text, *args, **kwargs: (analysis_result.AnalysisResult(70, "ok", (), (), ()), {}, False),
+    )
+    (tmp_path / "resume.txt").write_text("Python developer", encoding="utf-8")
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.txt").write_text(f"Job {name} needs Python", encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    def run(*extra):
+        batch_cli.main([
+            "--resumes", str(tmp_path / "resume.txt"), "--jobs", str(tmp_path / "a.txt"), str(tmp_path / "b.txt"),
+            "--output", str(output), *extra,
+        ])
+        records = []
+        for line in output.read_text(encoding="utf-8").splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # The torn line
+        return records
+
+    return output, run
+
+
+def test_record_after_a_torn_line_survives_resume(batch):
+    output, run = batch
+    first = run()[0]
+    # A crash while writing the second record leaves a torn last line
+    output.write_text(json.dumps(first) + '\n{"pair_id": "torn', encoding="utf-8")
+    run()
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[1] == '{"pair_id": "torn'
+    assert len(batch_cli.completed_pairs(str(output))) == 2
+    assert len(run()) == 2  # Nothing left to run, nothing appended
+
+
+def test_restart_truncates_the_output(batch):
+    output, run = batch
+    assert len(run()) == 2
+    assert len(run("--restart")) == 2
+
+
+def test_unreadable_document_is_skipped(batch, tmp_path):
+    output, run = batch
+    (tmp_path / "b.txt").write_bytes(b"\xff\xfe not utf-8")
+    records = run()
+    assert [record["job"] for record in records] == [str(tmp_path / "a.txt")]
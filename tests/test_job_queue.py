@@ -0,0 +1,62 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import job_queue
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _insert_running(queue, job_id, owner):
+    with queue._conn:
+        queue._conn.execute(
+            "INSERT INTO jobs (id, kind, status, payload, owner, created_at, started_at, heartbeat_at) "
+            "VALUES (?, 'test', 'running', '{}', ?, ?, ?, ?)",
+            (job_id, owner, time.time(), time.time(), time.time()),
+        )
+
+
+def test_jobs_of_dead_or_replaced_processes_on_this_host_are_requeued(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    queue = job_queue.JobQueue(db_path)
+    host = socket.gethostname()
+    _insert_running(queue, "dead-pid", f"{host}:{_dead_pid()}:0000")
+    # A restarted container reuses the PID of the process that died (often PID 1)
+    _insert_running(queue, "reused-pid", f"{host}:{os.getpid()}:0000")
+    _insert_running(queue, "legacy-dead-pid", str(_dead_pid()))
+    _insert_running(queue, "ours", job_queue.owner_token())
+
+    reopened = job_queue.JobQueue(db_path)
+    statuses = {job_id: reopened.get(job_id).status for job_id in ("dead-pid", "reused-pid", "legacy-dead-pid", "ours")}
+    assert statuses == {"dead-pid": "queued", "reused-pid": "queued", "legacy-dead-pid": "queued", "ours": "running"}
+
+
+def test_other_hosts_jobs_are_requeued_once_their_heartbeat_expires(tmp_path):
+    queue = job_queue.JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=60)
+    _insert_running(queue, "alive", "elsewhere:1:0000")
+    _insert_running(queue, "silent", "elsewhere:2:0000")
+    with queue._conn:
+        queue._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = 'silent'", (time.time() - 120,))
+
+    assert queue._requeue_orphans() == 1
+    assert queue.get("alive").status == "running"
+    assert queue.get("silent").status == "queued"
+
+
+def test_unserializable_result_fails_the_job(tmp_path):
+    queue = job_queue.JobQueue(str(tmp_path / "jobs.sqlite3"), workers=1)
+    queue.register("test", lambda payload: {object()})
+    queue.start()
+    job_id = queue.submit("test", {})
+    deadline = time.time() + 10
+    while queue.get(job_id).status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.05)
+    job = queue.get(job_id)
+    assert job.status == "failed"
+    assert "could not be stored" in job.error
@@ -0,0 +1,16 @@
+import prompt_builder
+
+
+def test_chunks_of_one_long_line_stay_within_budget():
+    # A JD pasted without line breaks: a single ~15k-token line
+    text = " ".join(f"Build {word} services for customers." for word in ("python", "data", "scale") * 2000)
+    chunks = prompt_builder.chunk_document(text, 1500)
+    assert len(chunks) > 1
+    assert all(prompt_builder.estimate_tokens(chunk) <= 1500 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_a_word_longer_than_a_chunk_is_cut():
+    chunks = prompt_builder.chunk_document("x" * 10000, 100)
+    assert all(prompt_builder.estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == "x" * 10000
@@ -0,0 +1,23 @@
+import skills
+
+
+def test_one_letter_languages_skip_joined_words():
+    report = skills.compare(
+        "Python developer with SQL", "We value R&D and C-level communication. Python and SQL required."
+    )
+    assert "C" not in report.jd_counts
+    assert "R" not in report.jd_counts
+    assert report.missing == ["Communication"]
+
+
+def test_one_letter_languages_need_a_list():
+    matcher = skills.default_matcher()
+    assert matcher.count("Languages: C, C++ and R.") == {"C": 1, "C++": 1, "R": 1}
+    assert matcher.count("Python or R") == {"Python": 1, "R": 1}
+    assert matcher.count("Reports go to the C-suite; plan B is ready") == {}
+
+
+def test_case_sensitive_terms_skip_joined_words():
+    matcher = skills.default_matcher()
+    assert matcher.count("Our go-to-market team") == {}
+    assert matcher.count("Go-to-market plans; services written in Go") == {"Go": 1}